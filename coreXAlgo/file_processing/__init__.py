@@ -42,6 +42,7 @@ annotation_convert_all = [
 
 image_crop_all = [
     'resize_box_to_target',
+    'resize_boxes_to_target',
     'sliding_crop_image',
     'TaggedImageCrop',
     'batch_multithreaded_image_cropping'
@@ -541,6 +541,25 @@ class VOCAnnotation:
                 self.logger = set_logging("VOCAnnotation", verbose=self.verbose)
             self.logger.info(f"Added object: {name} {bbox}")
 
+    def to_bytes(self) -> bytes:
+        """
+        序列化为标准VOC XML内容，格式与 save 写入的文件完全一致
+
+        Returns:
+            bytes: UTF-8编码的XML内容（含XML声明）
+
+        Example:
+            >>> xml_bytes = annotator.to_bytes()
+            >>> # 可交给其他线程写入文件
+            >>> Path("data/annotations/001.xml").write_bytes(xml_bytes)
+        """
+        return etree.tostring(
+            self.root,
+            pretty_print=True,
+            xml_declaration=True,
+            encoding="UTF-8"
+        )
+
     def save(self, xml_path: str):
         """
         保存为标准VOC XML文件
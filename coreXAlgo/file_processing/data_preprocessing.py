@@ -8,8 +8,27 @@ import shutil
 import time
 from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Dict, Any
+
+from tqdm import tqdm
 from ..utils.basic import set_logging
 from ..utils.constants import IMAGE_TYPE_FORMAT
+from ..utils.io_util import imread_mmap, cv2_num_threads, atomic_write_bytes
+
+# 小写图片扩展名集合，用于不区分大小写的后缀匹配
+_IMAGE_EXTS = frozenset(ext.lower() for ext in IMAGE_TYPE_FORMAT)
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    """
+    备份文件：优先创建硬链接（只新增目录项，不复制数据），跨设备或文件系统不支持时回退到 shutil.copy2
+
+    硬链接备份要求之后对原文件的修改都通过 atomic_write_bytes 写入新文件，而不是原地截断覆盖。
+    src 为符号链接时链接其指向的真实文件，否则备份只是同一个符号链接，会随原文件一起被修改。
+    """
+    try:
+        os.link(os.path.realpath(src), dst)
+    except OSError:
+        shutil.copy2(src, dst)
 
 
 # 旋转类型枚举
@@ -22,6 +41,24 @@ class RotationType(Enum):
     ROTATE_180 = '180'  # 180度旋转
 
 
+# 旋转类型 -> cv2.rotate 旋转码
+_CV2_ROT = {
+    RotationType.CLOCKWISE_90.value: cv2.ROTATE_90_CLOCKWISE,
+    RotationType.COUNTERCLOCKWISE_90.value: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    RotationType.ROTATE_180.value: cv2.ROTATE_180,
+}
+
+# 旋转类型 -> YOLO归一化坐标变换 (x_center, y_center, width, height) -> 新坐标
+_LABEL_ROT = {
+    # 顺时针90度: (x, y) -> (1-y, x)，宽高互换
+    RotationType.CLOCKWISE_90.value: lambda x, y, w, h: (1.0 - y, x, h, w),
+    # 逆时针90度: (x, y) -> (y, 1-x)，宽高互换
+    RotationType.COUNTERCLOCKWISE_90.value: lambda x, y, w, h: (y, 1.0 - x, h, w),
+    # 180度: (x, y) -> (1-x, 1-y)
+    RotationType.ROTATE_180.value: lambda x, y, w, h: (1.0 - x, 1.0 - y, w, h),
+}
+
+
 class YOLODataPreprocessor:
     """
     YOLO数据预处理类
@@ -58,16 +95,12 @@ class YOLODataPreprocessor:
         Returns:
             bool: 旋转是否成功
         """
-        # 读取图片 - 内存优化：对于大图片，使用降采样减少内存使用
+        # 读取图片 - 内存映射后一次性全分辨率解码
         try:
-            # 尝试使用降采样读取图片，减少内存使用
-            img = cv2.imread(str(image_path), cv2.IMREAD_REDUCED_COLOR_8)
+            img = imread_mmap(image_path)
             if img is None:
-                # 如果降采样失败，使用普通读取
-                img = cv2.imread(str(image_path))
-                if img is None:
-                    self.logger.error(f"无法读取图片: {image_path}")
-                    return False
+                self.logger.error(f"无法读取图片: {image_path}")
+                return False
         except Exception as e:
             self.logger.error(f"读取图片失败: {e}")
             return False
@@ -79,34 +112,34 @@ class YOLODataPreprocessor:
             backup_dir = Path(backup_dir)
             backup_dir.mkdir(parents=True, exist_ok=True)
 
-            # 备份图片
+            # 备份图片（硬链接，失败时复制）
             img_backup_path = backup_dir / image_path.name
-            shutil.copy2(image_path, img_backup_path)
+            _link_or_copy(image_path, img_backup_path)
 
             # 备份标签文件
             if txt_path.exists():
                 txt_backup_path = backup_dir / txt_path.name
-                shutil.copy2(txt_path, txt_backup_path)
+                _link_or_copy(txt_path, txt_backup_path)
 
         # 执行图片旋转
-        if rotation_type == RotationType.CLOCKWISE_90.value:  # 顺时针90度
-            rotated_img = cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
-        elif rotation_type == RotationType.COUNTERCLOCKWISE_90.value:  # 逆时针90度
-            rotated_img = cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
-        elif rotation_type == RotationType.ROTATE_180.value:  # 180度旋转
-            rotated_img = cv2.rotate(img, cv2.ROTATE_180)
-        else:
+        rotate_code = _CV2_ROT.get(rotation_type)
+        if rotate_code is None:
             self.logger.error(f"无效的旋转类型: {rotation_type}")
             return False
+        rotated_img = cv2.rotate(img, rotate_code)
 
-        # 保存旋转后的图片（覆盖原文件）
-        cv2.imwrite(str(image_path), rotated_img)
-        self.logger.info(f"✓ 已旋转图片: {image_path.name} -> {rotation_type}度")
+        # 保存旋转后的图片（替换原文件，不原地覆盖以保护硬链接备份）
+        success, encoded = cv2.imencode(image_path.suffix, rotated_img)
+        if not success:
+            self.logger.error(f"图片编码失败: {image_path}")
+            return False
+        atomic_write_bytes(image_path, encoded)
+        self.logger.debug(f"✓ 已旋转图片: {image_path.name} -> {rotation_type}度")
 
         # 处理标签文件
         if txt_path.exists():
             self._rotate_yolo_labels_file(txt_path, rotation_type)
-            self.logger.info(f"✓ 已更新标签: {txt_path.name}")
+            self.logger.debug(f"✓ 已更新标签: {txt_path.name}")
         else:
             self.logger.warning(f"⚠ 未找到标签文件: {txt_path.name}")
 
@@ -123,6 +156,8 @@ class YOLODataPreprocessor:
             rotation_type: 旋转类型 ('90'顺时针90度, '270'逆时针90度, '180'180度)
         """
         new_lines = []
+        # 未知旋转类型保持坐标不变
+        transform = _LABEL_ROT.get(rotation_type, lambda x, y, w, h: (x, y, w, h))
 
         try:
             with open(txt_path, 'r') as f:
@@ -142,25 +177,7 @@ class YOLODataPreprocessor:
                     height = float(parts[4])
 
                     # 应用旋转变换
-                    if rotation_type == RotationType.CLOCKWISE_90.value:  # 顺时针90度
-                        # 坐标变换: (x, y) -> (1-y, x)
-                        new_x_center = 1.0 - y_center
-                        new_y_center = x_center
-                        new_width = height
-                        new_height = width
-                    elif rotation_type == RotationType.COUNTERCLOCKWISE_90.value:  # 逆时针90度
-                        # 坐标变换: (x, y) -> (y, 1-x)
-                        new_x_center = y_center
-                        new_y_center = 1.0 - x_center
-                        new_width = height
-                        new_height = width
-                    elif rotation_type == RotationType.ROTATE_180.value:  # 180度
-                        new_x_center = 1.0 - x_center
-                        new_y_center = 1.0 - y_center
-                        new_width = width
-                        new_height = height
-                    else:
-                        new_x_center, new_y_center, new_width, new_height = x_center, y_center, width, height
+                    new_x_center, new_y_center, new_width, new_height = transform(x_center, y_center, width, height)
 
                     # 确保坐标在[0,1]范围内
                     new_x_center = max(0.0, min(1.0, new_x_center))
@@ -175,11 +192,9 @@ class YOLODataPreprocessor:
                     self.logger.warning(f"警告: 解析标签行时出错 '{line.strip()}' -> {e}")
                     new_lines.append(line.strip())  # 保留原行
 
-            # 写回文件（覆盖）
-            with open(txt_path, 'w') as f:
-                for line in new_lines:
-                    f.write(line + '\n')
-                
+            # 拼接后一次性写回（写临时文件后替换，不原地覆盖以保护硬链接备份）
+            atomic_write_bytes(txt_path, ''.join(line + '\n' for line in new_lines).encode('utf-8'))
+
         except Exception as e:
             self.logger.error(f"处理标签文件时出错 {txt_path}: {e}")
     
@@ -197,8 +212,8 @@ class YOLODataPreprocessor:
                           - RotationType.ROTATE_180.value: 180度旋转
                           默认: RotationType.CLOCKWISE_90.value
             ratio: 随机旋转比例 (0-1)，默认0.5
-            backup: 是否备份原文件
-            max_workers: 最大线程数，默认4
+            backup: 是否备份原文件，备份到与图片文件夹同级的 <图片文件夹名>_backup_<时间戳> 目录
+            max_workers: 最大线程数，默认4，建议不超过CPU核心数（旋转期间OpenCV内部限制为单线程）
         """
         # 验证旋转类型
         valid_rotation_types = [rt.value for rt in RotationType]
@@ -232,18 +247,18 @@ class YOLODataPreprocessor:
         if backup:
             try:
                 timestamp = time.strftime("%Y%m%d_%H%M%S")
-                backup_dir = image_folder / f"backup_{timestamp}"
+                # 备份目录放在图片文件夹同级，避免再次扫描图片文件夹时把备份也当作数据集
+                backup_dir = image_folder.parent / f"{image_folder.name}_backup_{timestamp}"
                 self.logger.info(f"备份目录: {backup_dir}")
             except Exception as e:
                 self.logger.error(f"创建备份目录失败: {e}")
                 backup_dir = None
 
-        image_files = []
-
         try:
-            for file_path in image_folder.iterdir():
-                if file_path.is_file() and file_path.suffix in IMAGE_TYPE_FORMAT:
-                    image_files.append(file_path)
+            # os.scandir 直接给出文件名和类型，无需为每个目录项创建Path并重新解析后缀
+            with os.scandir(image_folder) as entries:
+                image_files = [Path(entry.path) for entry in entries
+                               if entry.is_file() and os.path.splitext(entry.name)[1].lower() in _IMAGE_EXTS]
         except Exception as e:
             self.logger.error(f"读取文件夹失败: {e}")
             return
@@ -272,15 +287,13 @@ class YOLODataPreprocessor:
         # 旋转文件
         rotated_count = 0
         
-        # 使用多线程处理
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # 使用多线程处理，OpenCV内部只用单线程，避免与线程池叠加造成过度订阅
+        with cv2_num_threads(1), ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = []
-            for i, image_path in enumerate(files_to_rotate, 1):
+            for image_path in files_to_rotate:
                 # 确定对应的标签文件
                 txt_path = label_folder / f"{image_path.stem}.txt"
-                
-                self.logger.info(f"[{i}/{rotate_count}] 处理: {image_path.name} ({rotation_type}度)")
-                
+
                 # 提交任务到线程池
                 futures.append(executor.submit(
                     self._rotate_image_and_labels,
@@ -290,8 +303,8 @@ class YOLODataPreprocessor:
                     backup_dir
                 ))
             
-            # 等待所有任务完成并收集结果
-            for future in futures:
+            # 等待所有任务完成并收集结果，用进度条代替逐文件日志
+            for future in tqdm(futures, total=rotate_count, desc=f"旋转 {rotation_type}度"):
                 if future.result():
                     rotated_count += 1
 
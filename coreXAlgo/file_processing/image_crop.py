@@ -1,8 +1,24 @@
+import contextlib
+import copy
+import functools
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
 import cv2
+import numpy as np
+from lxml import etree
 from tqdm import tqdm
 
 from ..utils.basic import set_logging
+from ..utils.io_util import imread_mmap, cv2_num_threads
+from .annotation_convert import VOCAnnotation
+
+try:
+    import numba
+except ImportError:  # numba为可选依赖，未安装时使用NumPy实现
+    numba = None
 
 
 def resize_box_to_target(box, target_size, original_size):
@@ -25,21 +41,151 @@ def resize_box_to_target(box, target_size, original_size):
         >>> new_box = resize_box_to_target(original_box, target_size, original_size)
         >>> print(new_box)  # [50, 25, 100, 75] (等比例缩小一半)
     """
+    return resize_boxes_to_target([box[:4]], target_size, original_size)[0].tolist()
+
+
+def resize_boxes_to_target(boxes, target_size, original_size):
+    """
+    resize_box_to_target 的批量版本，一次性将 (N, 4) 的边界框数组等比缩放到目标尺寸
+
+    使用float64计算并以 np.rint 取整（四舍六入五取偶），与Python内置 round 的取整规则相同。
+
+    Args:
+        boxes (numpy.ndarray | List[List[int]]): 原始图像上的边界框，形状为 (N, 4)，格式为 [x_min, y_min, x_max, y_max]
+        target_size (Tuple[int]): 目标图像的尺寸，格式为 (width, height)
+        original_size (Tuple[int]): 原始图像的尺寸，格式为 (width, height)
+
+    Returns:
+        numpy.ndarray: 缩放后的边界框数组，形状为 (N, 4)，dtype=int64
+
+    Example:
+        >>> boxes = np.array([[100, 50, 200, 150], [0, 0, 1600, 1200]])
+        >>> resize_boxes_to_target(boxes, (800, 600), (1600, 1200))
+        array([[ 50,  25, 100,  75],
+               [  0,   0, 800, 600]])
+    """
     tar_w, tar_h = target_size
     orig_w, orig_h = original_size
-
     scale_x = tar_w / orig_w
     scale_y = tar_h / orig_h
+    scale = np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float64)
+    return np.rint(np.asarray(boxes, dtype=np.float64).reshape(-1, 4) * scale).astype(np.int64)
 
-    return [
-        int(round(box[0] * scale_x)),
-        int(round(box[1] * scale_y)),
-        int(round(box[2] * scale_x)),
-        int(round(box[3] * scale_y))
-    ]
 
+@functools.lru_cache(maxsize=None)
+def _get_logger(name, verbose=False):
+    """
+    获取模块级缓存的日志记录器
 
-def sliding_crop_image(img, crop_size=None, stride=None):
+    set_logging 每次调用都会追加一个 StreamHandler，批量任务中逐张图片调用会重复配置并导致日志重复输出，
+    这里按 (name, verbose) 只配置一次。
+    """
+    return set_logging(name, verbose=verbose)
+
+
+def _write_bytes(file_path, data):
+    """
+    将已编码的数据写入文件，供后台写线程调用
+
+    Args:
+        file_path: 目标文件路径
+        data: 支持缓冲区协议的数据（bytes 或 cv2.imencode 返回的数组）
+    """
+    # 直接使用文件描述符写入，不经过Python的缓冲文件对象；常规文件通常一次write即可写完
+    view = memoryview(data).cast('B')
+    fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+# 裁剪块JPEG编码参数：质量与OpenCV默认值一致，显式关闭霍夫曼表优化和渐进式编码，避免额外的编码遍历
+_JPEG_ENCODE_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 95, cv2.IMWRITE_JPEG_OPTIMIZE, 0, cv2.IMWRITE_JPEG_PROGRESSIVE, 0]
+
+# 单个 TaggedImageCrop 实例后台编码、写入裁剪块的最大线程数
+_MAX_IO_WORKERS = 4
+
+
+def _encode_and_write_jpeg(file_path, image):
+    """
+    将图像编码为JPEG并写入文件，供后台I/O线程调用
+
+    cv2.imencode 在编码期间释放GIL，多个I/O线程可以同时编码不同的裁剪块。
+
+    Args:
+        file_path: 目标文件路径
+        image: BGR图像数组
+    """
+    success, encoded = cv2.imencode('.jpg', image, _JPEG_ENCODE_PARAMS)
+    if not success:
+        raise ValueError(f"JPEG编码失败: {os.path.basename(file_path)}")
+    _write_bytes(file_path, encoded)
+
+
+# 裁剪块VOC XML字符串模板，输出与 VOCAnnotation.save 的结果逐字节一致
+_VOC_XML_TEMPLATE = (
+    "<?xml version='1.0' encoding='UTF-8'?>\n"
+    "<annotation>\n"
+    "  <folder>{folder}</folder>\n"
+    "  <filename>{filename}</filename>\n"
+    "  <path>{path}</path>\n"
+    "  <source>\n"
+    "    <database>Unknown</database>\n"
+    "  </source>\n"
+    "  <size>\n"
+    "    <width>{width}</width>\n"
+    "    <height>{height}</height>\n"
+    "    <depth>3</depth>\n"
+    "  </size>\n"
+    "  <segmented>0</segmented>\n"
+    "{objects}"
+    "</annotation>\n"
+)
+_VOC_OBJECT_TEMPLATE = (
+    "  <object>\n"
+    "    <name>{name}</name>\n"
+    "    <pose>Unspecified</pose>\n"
+    "    <truncated>0</truncated>\n"
+    "    <difficult>0</difficult>\n"
+    "    <bndbox>\n"
+    "      <xmin>{xmin}</xmin>\n"
+    "      <ymin>{ymin}</ymin>\n"
+    "      <xmax>{xmax}</xmax>\n"
+    "      <ymax>{ymax}</ymax>\n"
+    "    </bndbox>\n"
+    "  </object>\n"
+)
+
+
+@functools.lru_cache(maxsize=64)
+def _crop_offsets(h, w, crop_size, stride):
+    """
+    计算滑动裁剪的全部左上角坐标
+
+    结果按 (h, w, crop_size, stride) 缓存，批量处理同尺寸图像时只计算一次。
+
+    Args:
+        h: 图像高度
+        w: 图像宽度
+        crop_size: 裁剪窗口大小
+        stride: 滑动步长
+
+    Returns:
+        numpy.ndarray: 形状为 (N, 2) 的只读数组，每行为 (x, y)，按先行后列的顺序排列
+    """
+    ys, xs = np.meshgrid(
+        np.arange(0, h - crop_size + 1, stride),
+        np.arange(0, w - crop_size + 1, stride),
+        indexing='ij'
+    )
+    offsets = np.stack([xs.ravel(), ys.ravel()], axis=1)
+    offsets.flags.writeable = False
+    return offsets
+
+
+def sliding_crop_image(img, crop_size=None, stride=None, return_list=True):
     """
     滑动裁剪图片，返回裁剪的图像块及其位置信息
 
@@ -47,12 +193,14 @@ def sliding_crop_image(img, crop_size=None, stride=None):
         img: 输入图像，numpy数组格式，形状为 [高度, 宽度, 通道数] 或 [高度, 宽度]
         crop_size: 裁剪窗口大小
         stride: 滑动步长
+        return_list: 是否返回列表，False时返回逐个产生裁剪块的生成器，不一次性创建全部裁剪块对象
 
     Returns:
-        list: 包含裁剪图像块及其坐标信息的列表，每个元素为 [crop_img, x, y]
+        list | generator: 包含裁剪图像块及其坐标信息的列表（或生成器），每个元素为 [crop_img, x, y]
             - crop_img: 裁剪出的图像块，numpy数组
             - x: 该图像块在原图中的左上角x坐标
             - y: 该图像块在原图中的左上角y坐标
+            裁剪块按先行后列的顺序排列
 
     Example:
         >>> import numpy as np
@@ -65,16 +213,369 @@ def sliding_crop_image(img, crop_size=None, stride=None):
         >>> # 访问第一个裁剪块和其坐标
         >>> first_crop, x, y = crops[0]
         >>> print(f"第一个裁剪块位置: x={x}, y={y}, 形状: {first_crop.shape}")
+        >>>
+        >>> # 裁剪块是原图的可写视图，修改会同步到原图
+        >>> first_crop[...] = 0
+        >>> assert not image[:64, :64].any()
+    """
+    crops = _iter_sliding_crops(img, crop_size, stride)
+    return list(crops) if return_list else crops
+
+
+def _iter_sliding_crops(img, crop_size, stride):
+    """
+    逐个产生 sliding_crop_image 的裁剪块 [crop_img, x, y]
     """
     h, w = img.shape[:2]
-    crops = []
-    
-    for y in range(0, h - crop_size + 1, stride):
-        for x in range(0, w - crop_size + 1, stride):
-            crop = img[y:y + crop_size, x:x + crop_size]
-            crops.append([crop, x, y])
-    
-    return crops
+    if h < crop_size or w < crop_size:
+        return
+
+    # 每个裁剪块都是原图的普通切片视图：不复制像素数据，且与原图一样可写
+    for x, y in _crop_offsets(h, w, crop_size, stride).tolist():
+        yield [img[y:y + crop_size, x:x + crop_size], x, y]
+
+
+# <bndbox>中坐标子节点的读取顺序
+_BNDBOX_KEYS = ('xmin', 'ymin', 'xmax', 'ymax')
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_voc_objects(xml_file, mtime_ns, size):
+    """
+    流式解析VOC XML中的全部目标，结果按 (路径, 修改时间, 文件大小) 缓存
+
+    只在<object>结束时处理，处理完立即释放节点。返回未经裁剪和缩放的原始坐标，
+    结果为不可变元组，可在多次调用之间安全共享。
+
+    Args:
+        xml_file: XML标注文件路径
+        mtime_ns: 文件修改时间（纳秒），文件被修改后缓存自动失效
+        size: 文件大小，文件系统时间戳精度较粗时，短时间内重写的文件仍可通过大小区分
+
+    Returns:
+        tuple: 每个元素为 (name, kind, (xmin, ymin, xmax, ymax))，kind 为 _defect_kind 返回的判定策略类别编码
+    """
+    objects = []
+    for _, obj in etree.iterparse(xml_file, events=('end',), tag='object'):
+        # 每个<object>和<bndbox>的子节点各遍历一次，不依赖子节点顺序；同名子节点以第一个为准，与findtext一致
+        name = None
+        coords = None
+        for child in obj:
+            if child.tag == 'name':
+                if name is None:
+                    name = child.text or ''
+            elif child.tag == 'bndbox' and coords is None:
+                coords = {}
+                for coord in child:
+                    coords.setdefault(coord.tag, coord.text or '')
+        box = tuple(int(float(coords[key])) for key in _BNDBOX_KEYS)
+        obj.clear()
+        objects.append((name, _defect_kind(name), box))
+    return tuple(objects)
+
+
+# 缺陷判定策略类别编码，与 _box_in_crop 中的分支一一对应
+_KIND_U4U = 0        # 名称以U4U结尾的覆盖性缺陷（先按裁剪块占比判断，再走通用策略）
+_KIND_MP1U_ML3U = 1  # MP1U / ML3U
+_KIND_MU2U = 2       # MU2U
+_KIND_OTHER = 3      # 其他缺陷，使用通用策略
+
+
+def _defect_kind(name):
+    """返回缺陷名称对应的判定策略类别编码"""
+    if name.endswith('U4U'):
+        return _KIND_U4U
+    if name in ('MP1U', 'ML3U'):
+        return _KIND_MP1U_ML3U
+    if name == 'MU2U':
+        return _KIND_MU2U
+    return _KIND_OTHER
+
+
+def _empty_annotations():
+    """
+    返回不含任何标注的 (names, boxes, kinds) 数组，格式与 TaggedImageCrop._parse_xml 的返回值相同
+    """
+    return np.empty(0, dtype=object), np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.int8)
+
+
+# 积分图预筛选的网格单元数上限，超过时不做预筛选
+_PREFILTER_MAX_CELLS = 1 << 22
+
+
+def _crops_with_boxes(boxes, offsets, crop_size):
+    """
+    基于积分图预筛选与标注框有重叠的裁剪块
+
+    以裁剪块大小和所有偏移量的最大公约数为单元，把标注框覆盖的单元标记为1并计算积分图，
+    每个裁剪块只需O(1)查表即可得到其覆盖的标注单元数。由于裁剪块边界都落在单元边界上，
+    单元数为0与裁剪块和所有标注框都不相交（交集面积为0）严格等价。
+
+    Args:
+        boxes: 标注边界框数组，形状为 (N, 4)，格式为 [xmin, ymin, xmax, ymax]
+        offsets: 裁剪块左上角坐标数组，形状为 (C, 2)，每行为 (x, y)
+        crop_size: 裁剪块大小
+
+    Returns:
+        numpy.ndarray: 形状为 (C,) 的布尔数组，True表示该裁剪块可能包含标注
+    """
+    if len(offsets) == 0 or len(boxes) == 0:
+        return np.zeros(len(offsets), dtype=bool)
+
+    cell = int(np.gcd.reduce(np.append(offsets.ravel(), crop_size)))
+    cols = (int(offsets[:, 0].max()) + crop_size) // cell
+    rows = (int(offsets[:, 1].max()) + crop_size) // cell
+    if rows * cols > _PREFILTER_MAX_CELLS:
+        return np.ones(len(offsets), dtype=bool)
+
+    # 标注框覆盖的单元范围 [c0, c1)，用二维差分数组一次性标记所有框
+    boxes = boxes.astype(np.int64)
+    cx0 = np.clip(boxes[:, 0] // cell, 0, cols)
+    cy0 = np.clip(boxes[:, 1] // cell, 0, rows)
+    cx1 = np.clip(-(-boxes[:, 2] // cell), 0, cols)
+    cy1 = np.clip(-(-boxes[:, 3] // cell), 0, rows)
+    valid = (cx1 > cx0) & (cy1 > cy0) & (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+    diff = np.zeros((rows + 1, cols + 1), dtype=np.int32)
+    np.add.at(diff, (cy0[valid], cx0[valid]), 1)
+    np.add.at(diff, (cy0[valid], cx1[valid]), -1)
+    np.add.at(diff, (cy1[valid], cx0[valid]), -1)
+    np.add.at(diff, (cy1[valid], cx1[valid]), 1)
+    coverage = (diff.cumsum(axis=0).cumsum(axis=1)[:rows, :cols] > 0).astype(np.uint8)
+    sat = cv2.integral(coverage)
+
+    # 查表得到每个裁剪块覆盖的标注单元数
+    x0 = offsets[:, 0] // cell
+    y0 = offsets[:, 1] // cell
+    x1 = x0 + crop_size // cell
+    y1 = y0 + crop_size // cell
+    covered = sat[y1, x1] - sat[y0, x1] - sat[y1, x0] + sat[y0, x0]
+    return covered > 0
+
+
+# NumPy批量计算时每块 (裁剪块数 × 标注数) 的元素上限，限制中间数组的内存占用
+_GRID_BLOCK_ELEMS = 1 << 20
+
+
+def _select_labels_np(boxes, kinds, offsets, crop_size):
+    """
+    计算一组裁剪块内需要保留的标注（NumPy广播实现），判定规则与 _box_in_crop 一致
+
+    所有裁剪块与所有标注一次性做 (裁剪块数, 标注数) 的广播计算，Python层只遍历命中的结果；
+    裁剪块很多时按块计算，控制中间数组大小。
+
+    Args:
+        boxes: 标注边界框数组，形状为 (N, 4)，格式为 [xmin, ymin, xmax, ymax]
+        kinds: 判定策略类别编码数组，形状为 (N,)
+        offsets: 裁剪块左上角坐标数组，形状为 (C, 2)，每行为 (x, y)
+        crop_size: 裁剪块大小
+
+    Returns:
+        tuple: (crop_indices, box_indices, local_boxes)，按裁剪块、标注顺序排列
+            - crop_indices: 命中的裁剪块下标，形状为 (M,)
+            - box_indices: 保留的标注下标，形状为 (M,)
+            - local_boxes: 对应的裁剪块坐标（已裁剪到裁剪块范围内），形状为 (M, 4)
+    """
+    offsets = np.asarray(offsets, dtype=np.int64).reshape(-1, 2)
+    crop_area = crop_size * crop_size
+    # 标注坐标按列拆成四个连续数组（SoA），每个分块的广播计算都直接读取连续内存
+    box_xmin, box_ymin, box_xmax, box_ymax = np.ascontiguousarray(np.asarray(boxes, dtype=np.int64).T)
+    defect_area = (box_xmax - box_xmin) * (box_ymax - box_ymin)
+    is_mp1u_ml3u = kinds == _KIND_MP1U_ML3U
+    is_mu2u = kinds == _KIND_MU2U
+    is_u4u = kinds == _KIND_U4U
+    is_generic = ~(is_mp1u_ml3u | is_mu2u)
+
+    crop_parts, box_parts, local_parts = [], [], []
+    block = max(1, _GRID_BLOCK_ELEMS // max(1, len(boxes)))
+    for start in range(0, len(offsets), block):
+        xs = offsets[start:start + block, 0:1]
+        ys = offsets[start:start + block, 1:2]
+
+        # 计算交集，形状为 (裁剪块数, 标注数)
+        inter_xmin = np.maximum(box_xmin, xs)
+        inter_ymin = np.maximum(box_ymin, ys)
+        inter_xmax = np.minimum(box_xmax, xs + crop_size)
+        inter_ymax = np.minimum(box_ymax, ys + crop_size)
+
+        inter_width = inter_xmax - inter_xmin
+        inter_height = inter_ymax - inter_ymin
+        overlapped = (inter_width > 0) & (inter_height > 0)
+        if not overlapped.any():
+            continue
+
+        intersect_area = inter_width * inter_height
+        defect_ratio = np.divide(intersect_area, defect_area,
+                                 out=np.zeros(intersect_area.shape, dtype=np.float64), where=defect_area > 0)
+        crop_ratio = intersect_area / crop_area
+        min_dimension = np.minimum(inter_width, inter_height)
+
+        # 通用策略：相对面积（缺陷角度）/ 相对面积（裁剪块角度）/ 绝对面积
+        generic = (((defect_ratio > 0.05) & (min_dimension > 3))
+                   | (crop_ratio > 0.15)
+                   | ((intersect_area > 3000) & (min_dimension > 5)))
+        # 各类别的判定结果按类别掩码合并为一个布尔表达式；U4U通常很大，只要交集占裁剪块10%以上就保留
+        keep = ((is_mp1u_ml3u & ((defect_ratio > 0.3) | (intersect_area > 20000)))
+                | (is_mu2u & (intersect_area > 40960) & (min_dimension > 10))
+                | (is_generic & generic)
+                | (is_u4u & (intersect_area > 0.1 * crop_area)))
+        keep &= overlapped
+
+        # 转换到裁剪块坐标并确保坐标在裁剪块内
+        rows, cols = np.nonzero(keep)
+        local_boxes = np.empty((len(rows), 4), dtype=np.int64)
+        local_boxes[:, 0] = np.clip(inter_xmin[rows, cols] - xs[rows, 0], 0, crop_size - 1)
+        local_boxes[:, 1] = np.clip(inter_ymin[rows, cols] - ys[rows, 0], 0, crop_size - 1)
+        local_boxes[:, 2] = np.clip(inter_xmax[rows, cols] - xs[rows, 0], 1, crop_size)
+        local_boxes[:, 3] = np.clip(inter_ymax[rows, cols] - ys[rows, 0], 1, crop_size)
+        crop_parts.append(rows + start)
+        box_parts.append(cols)
+        local_parts.append(local_boxes)
+
+    if not crop_parts:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, np.empty((0, 4), dtype=np.int64)
+    return np.concatenate(crop_parts), np.concatenate(box_parts), np.concatenate(local_parts)
+
+
+def _box_in_crop(boxes, kinds, i, x_offset, y_offset, crop_size):
+    """
+    判断第 i 个标注是否保留在裁剪块中
+
+    这是缺陷判定规则的唯一定义：对于大缺陷从裁剪块角度计算比例，并设置绝对面积阈值；
+    U4U等覆盖性缺陷单独处理。_select_labels_np 是同一规则的向量化实现。
+
+    Returns:
+        tuple: (keep, xmin, ymin, xmax, ymax)，坐标为已裁剪到裁剪块范围内的裁剪块坐标
+    """
+    xmin = np.int64(boxes[i, 0])
+    ymin = np.int64(boxes[i, 1])
+    xmax = np.int64(boxes[i, 2])
+    ymax = np.int64(boxes[i, 3])
+
+    # 计算交集
+    inter_xmin = max(xmin, x_offset)
+    inter_ymin = max(ymin, y_offset)
+    inter_xmax = min(xmax, x_offset + crop_size)
+    inter_ymax = min(ymax, y_offset + crop_size)
+    inter_width = inter_xmax - inter_xmin
+    inter_height = inter_ymax - inter_ymin
+    keep = False
+    if inter_width > 0 and inter_height > 0:
+        crop_area = crop_size * crop_size
+        intersect_area = inter_width * inter_height
+        defect_area = (xmax - xmin) * (ymax - ymin)
+        defect_ratio = intersect_area / defect_area if defect_area > 0 else 0.0
+        crop_ratio = intersect_area / crop_area
+        min_dimension = min(inter_width, inter_height)
+
+        kind = kinds[i]
+        if kind == _KIND_MP1U_ML3U:
+            keep = defect_ratio > 0.3 or intersect_area > 20000
+        elif kind == _KIND_MU2U:
+            keep = intersect_area > 40960 and min_dimension > 10
+        else:
+            keep = ((defect_ratio > 0.05 and min_dimension > 3)
+                    or crop_ratio > 0.15
+                    or (intersect_area > 3000 and min_dimension > 5))
+            # U4U通常很大，只要交集占裁剪块10%以上就保留
+            if kind == _KIND_U4U and intersect_area > 0.1 * crop_area:
+                keep = True
+
+    # 转换到裁剪块坐标并确保坐标在裁剪块内
+    return (keep,
+            min(max(inter_xmin - x_offset, 0), crop_size - 1),
+            min(max(inter_ymin - y_offset, 0), crop_size - 1),
+            min(max(inter_xmax - x_offset, 1), crop_size),
+            min(max(inter_ymax - y_offset, 1), crop_size))
+
+
+def _select_labels_loop(boxes, kinds, offsets, crop_size):
+    """
+    _select_labels_np 的逐裁剪块、逐标注循环实现，供numba编译为本地代码，返回值与 _select_labels_np 相同
+
+    分两遍计算：先统计每个裁剪块的命中数，再按前缀和位置写入预分配的输出数组。
+    两遍中各裁剪块互不依赖，编译为并行版本时按裁剪块用 prange 分配到多个线程。
+    标注预先按ymin排序，每个裁剪块用二分查找只遍历ymin在裁剪块下边界之上的标注；
+    命中结果随后按标注下标重新排序，保持与 _select_labels_np 相同的顺序。
+    """
+    n_crops = offsets.shape[0]
+
+    # 按ymin稳定排序，ymin >= 裁剪块下边界的标注不可能与该裁剪块相交
+    order = np.argsort(boxes[:, 1], kind='mergesort')
+    ymin_sorted = boxes[order, 1]
+
+    counts = np.zeros(n_crops, dtype=np.intp)
+    for c in _prange(n_crops):
+        x_offset = offsets[c, 0]
+        y_offset = offsets[c, 1]
+        count = 0
+        for k in range(np.searchsorted(ymin_sorted, y_offset + crop_size)):
+            i = order[k]
+            if boxes[i, 3] > y_offset and _box_in_crop(boxes, kinds, i, x_offset, y_offset, crop_size)[0]:
+                count += 1
+        counts[c] = count
+
+    starts = np.zeros(n_crops + 1, dtype=np.intp)
+    starts[1:] = np.cumsum(counts)
+    total = starts[n_crops]
+    crop_indices = np.empty(total, dtype=np.intp)
+    box_indices = np.empty(total, dtype=np.intp)
+    local_boxes = np.empty((total, 4), dtype=np.int64)
+    for c in _prange(n_crops):
+        x_offset = offsets[c, 0]
+        y_offset = offsets[c, 1]
+        start = starts[c]
+        pos = start
+        for k in range(np.searchsorted(ymin_sorted, y_offset + crop_size)):
+            i = order[k]
+            if boxes[i, 3] <= y_offset:
+                continue
+            keep, xmin, ymin, xmax, ymax = _box_in_crop(boxes, kinds, i, x_offset, y_offset, crop_size)
+            if keep:
+                # 插入排序：单个裁剪块的命中数很少，直接按标注下标插入到正确位置
+                j = pos
+                while j > start and box_indices[j - 1] > i:
+                    box_indices[j] = box_indices[j - 1]
+                    local_boxes[j, 0] = local_boxes[j - 1, 0]
+                    local_boxes[j, 1] = local_boxes[j - 1, 1]
+                    local_boxes[j, 2] = local_boxes[j - 1, 2]
+                    local_boxes[j, 3] = local_boxes[j - 1, 3]
+                    j -= 1
+                crop_indices[pos] = c
+                box_indices[j] = i
+                local_boxes[j, 0] = xmin
+                local_boxes[j, 1] = ymin
+                local_boxes[j, 2] = xmax
+                local_boxes[j, 3] = ymax
+                pos += 1
+    return crop_indices, box_indices, local_boxes
+
+
+# (裁剪块数 × 标注数) 达到该值时才使用多线程并行版本，规模较小时线程调度开销得不偿失
+_PARALLEL_MIN_PAIRS = 1 << 16
+# 进程池子进程中置为True，并行由进程池负责，不再启用numba多线程
+_IN_POOL_WORKER = False
+
+if numba is not None:
+    _prange = numba.prange
+    _box_in_crop = numba.njit(cache=True, nogil=True)(_box_in_crop)
+    _select_labels_serial = numba.njit(cache=True, nogil=True)(_select_labels_loop)
+    _select_labels_parallel = numba.njit(cache=True, nogil=True, parallel=True)(_select_labels_loop)
+
+    def _select_labels(boxes, kinds, offsets, crop_size):
+        """
+        选择numba编译版本：只在主线程且规模足够大时使用并行版本
+
+        线程池中的工作线程使用串行版本，numba默认的workqueue线程层不支持多个线程同时启动并行计算。
+        """
+        if (not _IN_POOL_WORKER
+                and len(offsets) * len(boxes) >= _PARALLEL_MIN_PAIRS
+                and threading.current_thread() is threading.main_thread()):
+            return _select_labels_parallel(boxes, kinds, offsets, crop_size)
+        return _select_labels_serial(boxes, kinds, offsets, crop_size)
+else:
+    _prange = range
+    _select_labels = _select_labels_np
 
 
 class TaggedImageCrop:
@@ -95,6 +596,7 @@ class TaggedImageCrop:
         generate_ok_xml (bool): 是否为OK图生成XML文件
         generate_nofound_tag (bool): 是否为OK图生成nofound标签
         verbose (bool): 是否显示详细日志
+        resize_per_crop (bool): 是否只对每个裁剪窗口做缩放，而不是先缩放整张图像
 
     Example:
         >>> # 基本用法：仅裁剪有缺陷的区域
@@ -125,7 +627,8 @@ class TaggedImageCrop:
     """
 
     def __init__(self, retrain_no_detect=False, separate_ok_ng=False, save_only_ok=False, save_dir=None, target_size=None, crop_size=640,
-                 stride=320, separate_images_xml=True, generate_ok_xml=True, generate_nofound_tag=False, verbose=False):
+                 stride=320, separate_images_xml=True, generate_ok_xml=True, generate_nofound_tag=False, verbose=False,
+                 resize_per_crop=False, use_xml_template=True, reduced_decode=False):
         """
         初始化图像裁剪处理器
 
@@ -157,6 +660,17 @@ class TaggedImageCrop:
                 - True: 为OK图生成XML文件时添加nofound标签，标签位置在图片正中心，宽度为50
                 - False: 为OK图生成XML文件时不添加标签
             verbose (bool): 是否显示详细日志信息
+            resize_per_crop (bool): 设置target_size时的缩放方式
+                - False: 先将整张图像缩放到target_size，再滑动裁剪
+                - True: 不缩放整张图像，按target_size坐标系下的滑窗位置在原图上取对应区域，
+                  只将该区域缩放到crop_size。原图远大于target_size时可显著减少缩放的像素量
+            use_xml_template (bool): 是否使用字符串模板直接生成裁剪块的XML
+                - True: 按模板拼接XML文本后一次写入，不构建XML树，输出与VOCAnnotation相同
+                - False: 通过VOCAnnotation构建XML树后保存
+            reduced_decode (bool): 设置target_size且需要缩小时，是否对JPEG按比例缩小解码
+                - True: 不含EXIF的JPEG直接按不小于target_size的最大比例（1/2、1/4、1/8）解码，再缩放到target_size，
+                  可大幅减少大图的解码时间和内存，像素结果与完整解码后再缩放略有差异
+                - False: 始终按原始分辨率解码
 
         注意：目录创建逻辑已优化，只有在实际保存文件时才会创建对应的目录，避免创建空文件夹。
         """
@@ -170,7 +684,10 @@ class TaggedImageCrop:
         self.generate_ok_xml = generate_ok_xml
         self.generate_nofound_tag = generate_nofound_tag
         self.verbose = verbose
-        self.logger = set_logging("TaggedImageCrop", verbose=self.verbose)
+        self.resize_per_crop = resize_per_crop
+        self.use_xml_template = use_xml_template
+        self.reduced_decode = reduced_decode
+        self._init_runtime_state()
 
         # 初始化保存目录路径
         if save_dir:
@@ -224,6 +741,42 @@ class TaggedImageCrop:
             self.save_ok_xml_dir = None
             self.save_xml_dir = None
 
+    def _init_runtime_state(self):
+        """
+        创建与当前进程绑定、不参与序列化的运行时对象
+        """
+        self.logger = _get_logger("TaggedImageCrop", verbose=self.verbose)
+        # 后台I/O线程：裁剪块的JPEG编码和落盘都在其中完成，线程在首次提交时才创建。
+        # 进程池子进程中并行已由进程池负责，只用一个线程
+        io_workers = 1 if _IN_POOL_WORKER else min(_MAX_IO_WORKERS, os.cpu_count() or 1)
+        self._writer = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="TaggedImageCrop-writer")
+        # 单一后台读线程：批量处理时提前读取解码下一张图像，与当前图像的裁剪重叠
+        self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="TaggedImageCrop-reader")
+        # 已提交预读取的图像，键为图像路径，值为读取任务的Future
+        self._prefetched = {}
+        # VOCAnnotation模板缓存，键为 (图片保存目录, 图片尺寸)
+        self._voc_templates = {}
+        # 字符串模板中与裁剪块无关的部分，键同 _voc_templates
+        self._voc_xml_heads = {}
+        # 已确认存在的保存目录，每个目录只在首次保存时调用一次 os.makedirs
+        self._created_dirs = set()
+
+    def __getstate__(self):
+        """
+        序列化时去掉日志记录器、后台读写线程和缓存，使实例可以传给进程池的子进程
+        """
+        state = self.__dict__.copy()
+        for key in ('logger', '_writer', '_reader', '_prefetched', '_voc_templates', '_voc_xml_heads', '_created_dirs'):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        """
+        反序列化后在当前进程中重新创建日志记录器、后台读写线程和缓存
+        """
+        self.__dict__.update(state)
+        self._init_runtime_state()
+
     def _parse_xml(self, xml_file, original_size):
         """
         解析XML标签文件，获取标注信息
@@ -233,212 +786,182 @@ class TaggedImageCrop:
             original_size: 原始图像尺寸 (width, height)
 
         Returns:
-            list: 标注信息列表，每个元素为 (name, box) 元组
+            tuple: (names, boxes, kinds)，只包含有效标注
+                - names: 标注名称数组，形状为 (N,)，dtype=object
+                - boxes: 边界框数组（已缩放到target_size），形状为 (N, 4)，dtype=int32
+                - kinds: 判定策略类别编码数组，形状为 (N,)，dtype=int8
         """
-        import xml.etree.ElementTree as ET
-        
         try:
-            tree = ET.parse(xml_file)
-            annotations = []
             orig_w, orig_h = original_size
 
-            for obj in tree.findall('object'):
-                name = obj.find('name').text
-                bndbox = obj.find('bndbox')
-                box = (
-                    int(float(bndbox.find('xmin').text)),
-                    int(float(bndbox.find('ymin').text)),
-                    int(float(bndbox.find('xmax').text)),
-                    int(float(bndbox.find('ymax').text))
-                )
-
-                # 边界检查
-                box = (
-                    max(0, box[0]),
-                    max(0, box[1]),
-                    min(orig_w, box[2]),
-                    min(orig_h, box[3])
-                )
-
-                if box[2] <= box[0] or box[3] <= box[1]:
-                    continue
-
-                # 缩放坐标
-                if self.target_size:
-                    target_w, target_h = self.target_size
-                    box = resize_box_to_target(box, (target_w, target_h), (orig_w, orig_h))
-
-                # 注意：这里移除了U4U的特殊扩展代码
-                # 让U4U保持原始大小，在_is_defect_in_crop中特殊处理
-                annotations.append((name, box))
-
+            # 按 (路径, 修改时间, 文件大小) 缓存原始标注，同一文件未修改时不重复解析
+            xml_stat = os.stat(xml_file)
+            raw_objects = _parse_voc_objects(str(xml_file), xml_stat.st_mtime_ns, xml_stat.st_size)
+            names = np.array([name for name, _, _ in raw_objects], dtype=object)
+            kinds = np.array([kind for _, kind, _ in raw_objects], dtype=np.int8)
+            boxes = np.array([box for _, _, box in raw_objects], dtype=np.int64).reshape(-1, 4)
+
+            # 边界检查
+            boxes[:, :2] = np.maximum(boxes[:, :2], 0)
+            boxes[:, 2] = np.minimum(boxes[:, 2], orig_w)
+            boxes[:, 3] = np.minimum(boxes[:, 3], orig_h)
+            valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+            names = names[valid]
+            kinds = kinds[valid]
+            boxes = boxes[valid]
+
+            # 缩放坐标，所有标注一次性计算
+            if self.target_size:
+                boxes = resize_boxes_to_target(boxes, self.target_size, (orig_w, orig_h))
+            boxes = boxes.astype(np.int32)
+
+            # 注意：这里移除了U4U的特殊扩展代码
+            # 让U4U保持原始大小，在_box_in_crop中特殊处理
             if self.verbose:
-                self.logger.info(f"解析XML: {xml_file}, 找到 {len(annotations)} 个标注")
-                for name, box in annotations:
-                    if name.endswith('U4U'):
-                        self.logger.info(f"  U4U标注: 大小={(box[2] - box[0])}x{(box[3] - box[1])}")
+                self.logger.info(f"解析XML: {xml_file}, 找到 {len(names)} 个标注")
+                # 用掩码一次性选出U4U标注，不在逐个标注的循环里判断名称
+                u4u = kinds == _KIND_U4U
+                for width, height in (boxes[u4u, 2:] - boxes[u4u, :2]).tolist():
+                    self.logger.info(f"  U4U标注: 大小={width}x{height}")
 
-            return annotations
+            return names, boxes, kinds
         except Exception as e:
             self.logger.error(f"解析XML错误 {xml_file}: {e}")
-            return []
+            return _empty_annotations()
 
-    def _is_defect_in_crop(self, defect_box, crop_box, defect_name):
+    def _update_labels_for_crops(self, names, boxes, kinds, offsets, crop_size):
         """
-        判断缺陷是否在裁剪区域内
+        一次性计算一张图所有裁剪块中的标签
+
+        判定规则由 _box_in_crop 定义，批量计算由 _select_labels 完成（安装numba时为编译后的 _select_labels_loop，否则为 _select_labels_np）。
 
         Args:
-            defect_box: 缺陷边界框 [xmin, ymin, xmax, ymax]
-            crop_box: 裁剪区域边界框 [xmin, ymin, xmax, ymax]
-            defect_name: 缺陷名称
+            names: 标注名称数组，形状为 (N,)
+            boxes: 标注边界框数组，形状为 (N, 4)，格式为 [xmin, ymin, xmax, ymax]
+            kinds: 判定策略类别编码数组，形状为 (N,)
+            offsets: 裁剪块左上角坐标数组，形状为 (C, 2)，每行为 (x, y)
+            crop_size: 裁剪块大小
 
         Returns:
-            bool: 是否在裁剪区域内
-            tuple: 裁剪块内的坐标 (xmin, ymin, xmax, ymax)
-
-        修复了原逻辑的问题：
-        1. 对于大缺陷，从裁剪块角度计算比例
-        2. 添加绝对面积阈值
-        3. 特殊处理U4U等覆盖性缺陷
+            list: 长度为 C 的列表，每个元素为对应裁剪块的标注列表，每个标注为 (name, xmin, ymin, xmax, ymax)，坐标为裁剪块坐标
         """
-        # 计算交集
-        inter_xmin = max(defect_box[0], crop_box[0])
-        inter_ymin = max(defect_box[1], crop_box[1])
-        inter_xmax = min(defect_box[2], crop_box[2])
-        inter_ymax = min(defect_box[3], crop_box[3])
+        crop_labels = [[] for _ in range(len(offsets))]
+        if len(boxes) == 0:
+            return crop_labels
+
+        # 积分图预筛选，只对与标注框有重叠的裁剪块计算标签
+        candidates = np.flatnonzero(_crops_with_boxes(boxes, offsets, crop_size))
+        if len(candidates) == 0:
+            return crop_labels
+
+        crop_indices, box_indices, local_boxes = _select_labels(boxes, kinds, offsets[candidates], crop_size)
+        crop_indices = candidates[crop_indices]
+        for c, i, (xmin, ymin, xmax, ymax) in zip(crop_indices.tolist(), box_indices.tolist(), local_boxes.tolist()):
+            # 确保坐标有效
+            if xmax > xmin and ymax > ymin:
+                crop_labels[c].append((names[i], xmin, ymin, xmax, ymax))
+            else:
+                self.logger.warning(f"无效的裁剪坐标: {(xmin, ymin, xmax, ymax)}")
 
-        if inter_xmax <= inter_xmin or inter_ymax <= inter_ymin:
-            return False, None
+        return crop_labels
 
-        inter_width = inter_xmax - inter_xmin
-        inter_height = inter_ymax - inter_ymin
-        intersect_area = inter_width * inter_height
+    def _new_voc_annotation(self, img_full_path, image_size):
+        """
+        基于缓存模板创建裁剪块的VOCAnnotation
 
-        # 计算裁剪块面积
-        crop_width = crop_box[2] - crop_box[0]
-        crop_height = crop_box[3] - crop_box[1]
-        crop_area = crop_width * crop_height
-
-        # 计算缺陷面积
-        defect_width = defect_box[2] - defect_box[0]
-        defect_height = defect_box[3] - defect_box[1]
-        defect_area = defect_width * defect_height
-
-        # 调试信息
-        if self.verbose and defect_name.endswith('U4U'):
-            self.logger.debug(
-                f"U4U缺陷检查: 交集面积={intersect_area}, 缺陷面积={defect_area}, "
-                f"裁剪块面积={crop_area}, 交集尺寸={inter_width}x{inter_height}"
-            )
+        同一保存目录、同一尺寸的裁剪块只构建一次模板（包括路径解析），
+        之后复制模板的XML结构并替换文件名和路径。
 
-        # 特殊处理U4U
-        if defect_name.endswith('U4U'):
-            # U4U通常很大，只要交集面积足够大就保留
-            if intersect_area > 0.1 * crop_area:  # 交集占裁剪块10%以上
-                return True, (
-                    inter_xmin - crop_box[0], 
-                    inter_ymin - crop_box[1],
-                    inter_xmax - crop_box[0], 
-                    inter_ymax - crop_box[1]
-                )
-
-        # 根据缺陷类型设置不同策略
-        if defect_name in ['MP1U', 'ML3U']:
-            # 策略1：相对面积
-            defect_ratio = intersect_area / defect_area if defect_area > 0 else 0
-            # 策略2：绝对面积
-            condition1 = defect_ratio > 0.3  # 降低阈值到30%
-            condition2 = intersect_area > 20000  # 绝对面积
-
-            if condition1 or condition2:
-                return True, (
-                    inter_xmin - crop_box[0], 
-                    inter_ymin - crop_box[1],
-                    inter_xmax - crop_box[0], 
-                    inter_ymax - crop_box[1]
-                )
-
-        elif defect_name == 'MU2U':
-            # MU2U策略
-            if intersect_area > 40960 and min(inter_width, inter_height) > 10:
-                return True, (
-                    inter_xmin - crop_box[0], 
-                    inter_ymin - crop_box[1],
-                    inter_xmax - crop_box[0], 
-                    inter_ymax - crop_box[1]
-                )
+        Args:
+            img_full_path: 裁剪块图片的保存路径
+            image_size: 裁剪块尺寸 (width, height)
 
-        else:
-            # 通用策略：多重条件判断
-            # 条件1：相对面积（缺陷角度）
-            defect_ratio = intersect_area / defect_area if defect_area > 0 else 0
-            # 条件2：相对面积（裁剪块角度）
-            crop_ratio = intersect_area / crop_area if crop_area > 0 else 0
-            # 条件3：绝对面积
-            absolute_area = intersect_area
-            # 条件4：最小尺寸
-            min_dimension = min(inter_width, inter_height)
-
-            # 组合判断
-            condition1 = defect_ratio > 0.05 and min_dimension > 3
-            condition2 = crop_ratio > 0.15  # 交集占裁剪块15%以上
-            condition3 = absolute_area > 3000 and min_dimension > 5
-
-            if condition1 or condition2 or condition3:
-                if self.verbose:
-                    self.logger.debug(
-                        f"缺陷 {defect_name} 在裁剪块内: "
-                        f"defect_ratio={defect_ratio:.2%}, "
-                        f"crop_ratio={crop_ratio:.2%}, "
-                        f"area={absolute_area}, "
-                        f"min_dim={min_dimension}"
-                    )
-                return True, (
-                    inter_xmin - crop_box[0], 
-                    inter_ymin - crop_box[1],
-                    inter_xmax - crop_box[0], 
-                    inter_ymax - crop_box[1]
-                )
+        Returns:
+            VOCAnnotation: 不含任何目标的标注对象
+        """
+        img_dir, img_filename = os.path.split(img_full_path)
+        key = (img_dir, image_size)
+        template = self._voc_templates.get(key)
+        if template is None:
+            template = VOCAnnotation(img_full_path, image_size=image_size, verbose=self.verbose)
+            self._voc_templates[key] = template
+
+        voc_ann = copy.copy(template)
+        voc_ann.root = copy.deepcopy(template.root)
+        voc_ann.objects = []
+        voc_ann.image_path = template.image_path.with_name(img_filename)
+        voc_ann.root.find('filename').text = img_filename
+        path_node = voc_ann.root.find('path')
+        path_node.text = os.path.join(os.path.dirname(path_node.text), img_filename)
+        return voc_ann
+
+    def _voc_xml_bytes(self, img_dir, img_filename, image_size, objects):
+        """
+        按字符串模板生成裁剪块的VOC XML内容
 
-        return False, None
+        目录名和解析后的目录路径取自VOCAnnotation模板，按 (图片保存目录, 图片尺寸) 转义后缓存，
+        每个裁剪块只需拼接文件名，不再做路径拆分和拼接。
 
-    def _update_labels_for_crop(self, annotations, x_offset, y_offset, crop_size):
+        Args:
+            img_dir: 裁剪块图片的保存目录
+            img_filename: 裁剪块图片的文件名
+            image_size: 裁剪块尺寸 (width, height)
+            objects: 目标列表，每个元素为 (name, [xmin, ymin, xmax, ymax])
+
+        Returns:
+            bytes: UTF-8编码的XML内容
+        """
+        key = (img_dir, image_size)
+        head = self._voc_xml_heads.get(key)
+        if head is None:
+            template = self._voc_templates.get(key)
+            if template is None:
+                template = VOCAnnotation(os.path.join(img_dir, img_filename), image_size=image_size,
+                                         verbose=self.verbose)
+                self._voc_templates[key] = template
+            # (转义后的目录名, <path>中文件名之前的目录前缀)
+            head = (escape(template.root.findtext('folder')),
+                    os.path.join(os.path.dirname(template.root.findtext('path')), ''))
+            self._voc_xml_heads[key] = head
+
+        folder, path_prefix = head
+        objects_xml = ''.join(
+            _VOC_OBJECT_TEMPLATE.format(
+                name=escape(name), xmin=bbox[0], ymin=bbox[1], xmax=bbox[2], ymax=bbox[3]
+            )
+            for name, bbox in objects
+        )
+        return _VOC_XML_TEMPLATE.format(
+            folder=folder,
+            filename=escape(img_filename),
+            path=escape(path_prefix + img_filename),
+            width=image_size[0],
+            height=image_size[1],
+            objects=objects_xml
+        ).encode('utf-8')
+
+    def _save_prefixes(self, base_filename):
         """
-        更新裁剪块中的标签
+        预先计算一张图片的各保存目录下的文件路径前缀，裁剪块只需拼接序号和后缀
 
         Args:
-            annotations: 原始标注信息列表
-            x_offset: 裁剪块左上角x坐标
-            y_offset: 裁剪块左上角y坐标
-            crop_size: 裁剪块大小
+            base_filename: 基础文件名
 
         Returns:
-            list: 裁剪后的标注信息列表
-        """
-        new_annotations = []
-        crop_box = [x_offset, y_offset, x_offset + crop_size, y_offset + crop_size]
-
-        for name, box in annotations:
-            # 判断缺陷是否在裁剪区域内
-            is_in_crop, crop_coords = self._is_defect_in_crop(box, crop_box, name)
-
-            if is_in_crop and crop_coords:
-                # 确保坐标在裁剪块内
-                xmin, ymin, xmax, ymax = crop_coords
-                xmin = max(0, min(xmin, crop_size - 1))
-                ymin = max(0, min(ymin, crop_size - 1))
-                xmax = max(1, min(xmax, crop_size))
-                ymax = max(1, min(ymax, crop_size))
-
-                # 确保坐标有效
-                if xmax > xmin and ymax > ymin:
-                    new_annotations.append((name, xmin, ymin, xmax, ymax))
-                else:
-                    self.logger.warning(f"无效的裁剪坐标: {crop_coords}")
+            dict: 键为保存目录，值为 os.path.join(保存目录, f"{base_filename}_")
+        """
+        save_dirs = (self.save_img_dir, self.save_xml_dir, self.save_ok_img_dir, self.save_ok_xml_dir)
+        return {d: os.path.join(d, f"{base_filename}_") for d in save_dirs if d}
 
-        return new_annotations
+    def _ensure_dir(self, dir_path):
+        """
+        确保保存目录存在：目录仍在首次保存时才创建，之后的裁剪块不再重复调用 os.makedirs
+        """
+        if dir_path not in self._created_dirs:
+            os.makedirs(dir_path, exist_ok=True)
+            self._created_dirs.add(dir_path)
 
-    def _save(self, crop_image, cropped_labels, base_filename, crop_index):
+    def _save(self, crop_image, cropped_labels, base_filename, crop_index, prefixes=None):
         """
         保存裁剪后的图像和标签
 
@@ -447,9 +970,13 @@ class TaggedImageCrop:
             cropped_labels: 裁剪后的标签
             base_filename: 基础文件名
             crop_index: 裁剪索引
+            prefixes: _save_prefixes 返回的路径前缀，批量保存同一张图片的裁剪块时传入以避免重复拼接路径
+
+        Returns:
+            list: 已提交的后台写入任务（concurrent.futures.Future），依次为图片和XML，未提交写入时为空列表
         """
         if not self.save_dir:
-            return
+            return []
 
         # 明确判断是否有标签
         has_labels = len(cropped_labels) > 0 if cropped_labels else False
@@ -458,7 +985,7 @@ class TaggedImageCrop:
         if self.save_only_ok and has_labels:
             if self.verbose:
                 self.logger.debug(f"跳过保存（有标签）: {base_filename}_{crop_index}")
-            return
+            return []
 
         # 确定保存路径
         if self.save_only_ok and not has_labels:
@@ -480,43 +1007,37 @@ class TaggedImageCrop:
                 save_type = "NG" if has_labels else "OK(images)"
 
         # 生成文件名
+        if prefixes is None:
+            prefixes = self._save_prefixes(base_filename)
         img_filename = f"{base_filename}_{crop_index}.jpg"
-        img_full_path = os.path.join(img_save_path, img_filename)
+        img_full_path = f"{prefixes[img_save_path]}{crop_index}.jpg"
 
         # 确保目录存在
-        os.makedirs(os.path.dirname(img_full_path), exist_ok=True)
+        self._ensure_dir(img_save_path)
 
-        # 保存图片
+        # 保存图片：编码和写文件都交给后台I/O线程，失败在 crop_image_and_labels 等待写入时记录
         try:
-            cv2.imwrite(img_full_path, crop_image)
+            write_futures = [self._writer.submit(_encode_and_write_jpeg, img_full_path, crop_image)]
             if self.verbose:
                 self.logger.debug(f"保存图片: {img_filename} ({save_type}) -> {os.path.basename(img_save_path)}")
         except Exception as e:
             self.logger.error(f"保存图片失败 {img_filename}: {e}")
-            return
+            return []
 
         # 保存XML文件 - 根据generate_ok_xml参数决定是否为OK图生成XML
         if has_labels or self.generate_ok_xml:
             xml_filename = f"{base_filename}_{crop_index}.xml"
-            xml_full_path = os.path.join(xml_save_path, xml_filename)
+            xml_full_path = f"{prefixes[xml_save_path]}{crop_index}.xml"
 
             # 确保XML目录存在
-            os.makedirs(os.path.dirname(xml_full_path), exist_ok=True)
+            self._ensure_dir(xml_save_path)
 
             try:
-                from .annotation_convert import VOCAnnotation
-                voc_ann = VOCAnnotation(
-                    img_full_path,
-                    image_size=(crop_image.shape[1], crop_image.shape[0]),
-                    verbose=self.verbose
-                )
+                objects = []
                 # 添加标签（如果有）
                 if has_labels and cropped_labels:
                     for label in cropped_labels:
-                        voc_ann.add_object(
-                            name=label[0],
-                            bbox=[float(label[1]), float(label[2]), float(label[3]), float(label[4])]
-                        )
+                        objects.append((label[0], [float(label[1]), float(label[2]), float(label[3]), float(label[4])]))
                 # 为OK图添加nofound标签
                 elif not has_labels and self.generate_nofound_tag:
                     # 计算图片中心坐标
@@ -530,12 +1051,18 @@ class TaggedImageCrop:
                     xmax = min(img_width, center_x + box_width // 2)
                     ymax = min(img_height, center_y + box_width // 2)
                     # 添加nofound标签
-                    voc_ann.add_object(
-                        name="nofound",
-                        bbox=[float(xmin), float(ymin), float(xmax), float(ymax)]
-                    )
-                # 保存XML
-                voc_ann.save(xml_full_path)
+                    objects.append(("nofound", [float(xmin), float(ymin), float(xmax), float(ymax)]))
+
+                # 保存XML：在调用线程生成XML内容，写文件交给后台I/O线程
+                image_size = (crop_image.shape[1], crop_image.shape[0])
+                if self.use_xml_template:
+                    xml_bytes = self._voc_xml_bytes(img_save_path, img_filename, image_size, objects)
+                else:
+                    voc_ann = self._new_voc_annotation(img_full_path, image_size)
+                    for name, bbox in objects:
+                        voc_ann.add_object(name=name, bbox=bbox)
+                    xml_bytes = voc_ann.to_bytes()
+                write_futures.append(self._writer.submit(_write_bytes, xml_full_path, xml_bytes))
                 if self.verbose:
                     if has_labels:
                         self.logger.debug(f"保存XML: {xml_filename} 包含 {len(cropped_labels)} 个目标 -> {os.path.basename(xml_save_path)}")
@@ -544,31 +1071,98 @@ class TaggedImageCrop:
             except Exception as e:
                 self.logger.error(f"保存XML失败 {xml_filename}: {e}")
 
-    def _process_image(self, image_path):
+        return write_futures
+
+    def _read_image(self, image_path):
         """
-        读取并预处理图像
+        读取并解码图像
 
         Args:
             image_path: 图像文件路径
 
         Returns:
-            tuple: (处理后的图像, 原始图像尺寸)
+            tuple: (解码后的图像, 原始图像尺寸 (width, height))，文件不存在或无法读取时返回 (None, None)
         """
-        # 读取图像
         if not os.path.exists(image_path):
             self.logger.error(f"图像文件不存在: {image_path}")
             return None, None
 
-        image = cv2.imread(image_path)
+        if self.reduced_decode and self.target_size:
+            image, original_size = imread_mmap(image_path, min_size=self.target_size)
+        else:
+            image = imread_mmap(image_path)
+            original_size = image.shape[:2][::-1] if image is not None else None
         if image is None:
             self.logger.error(f"无法读取图像: {image_path}")
-            return None, None
-        original_size = image.shape[:2][::-1]
+        return image, original_size
 
-        if self.target_size:
-            image = cv2.resize(image, self.target_size, interpolation=cv2.INTER_LINEAR)
+    def _prefetch_image(self, image_path):
+        """
+        在后台读线程中提前读取解码图像，随后对该图像调用 crop_image_and_labels 时直接使用结果
+
+        Args:
+            image_path: 图像文件路径
+        """
+        if image_path not in self._prefetched:
+            self._prefetched[image_path] = self._reader.submit(self._read_image, image_path)
+
+    def _process_image(self, image_path):
+        """
+        读取并预处理图像
+
+        Args:
+            image_path: 图像文件路径
+
+        Returns:
+            tuple: (处理后的图像, 原始图像尺寸)
+        """
+        # 读取图像，已预读取的直接取结果
+        future = self._prefetched.pop(image_path, None)
+        image, original_size = future.result() if future is not None else self._read_image(image_path)
+        if image is None:
+            return None, None
+        # 按比例缩小解码时，解码得到的尺寸小于原始尺寸
+        decoded_size = image.shape[:2][::-1]
+
+        # resize_per_crop模式下保留原图，缩放推迟到每个裁剪窗口；目标尺寸与解码尺寸相同时无需缩放
+        if self.target_size and not self.resize_per_crop and tuple(self.target_size) != decoded_size:
+            target_w, target_h = self.target_size
+            # 缩小时INTER_AREA更快且效果更好，其余情况使用INTER_LINEAR
+            if target_w <= decoded_size[0] and target_h <= decoded_size[1]:
+                interpolation = cv2.INTER_AREA
+            else:
+                interpolation = cv2.INTER_LINEAR
+            image = cv2.resize(image, self.target_size, interpolation=interpolation)
         return image, original_size
 
+    def _sliding_crop_resized(self, image):
+        """
+        在target_size坐标系下滑动裁剪，但直接从原图取对应区域并只缩放该区域
+
+        Args:
+            image: 未缩放的原始图像
+
+        Returns:
+            generator: 逐个产生与 sliding_crop_image 格式相同的 [crop_img, x, y]，
+                       x、y 为裁剪块在target_size坐标系下的左上角坐标
+        """
+        orig_h, orig_w = image.shape[:2]
+        target_w, target_h = self.target_size
+        scale_x = orig_w / target_w
+        scale_y = orig_h / target_h
+        crop_size = self.crop_size
+
+        for x, y in _crop_offsets(target_h, target_w, crop_size, self.stride).tolist():
+            # 裁剪窗口映射回原图坐标
+            x0 = int(round(x * scale_x))
+            y0 = int(round(y * scale_y))
+            x1 = min(orig_w, max(x0 + 1, int(round((x + crop_size) * scale_x))))
+            y1 = min(orig_h, max(y0 + 1, int(round((y + crop_size) * scale_y))))
+            roi = image[y0:y1, x0:x1]
+            # 缩小时INTER_AREA更快且效果更好，放大时使用INTER_LINEAR
+            interpolation = cv2.INTER_AREA if (x1 - x0) >= crop_size else cv2.INTER_LINEAR
+            yield [cv2.resize(roi, (crop_size, crop_size), interpolation=interpolation), x, y]
+
     def crop_image_and_labels(self, image_path, xml_path):
         """
         图像裁剪和标签修改
@@ -610,17 +1204,18 @@ class TaggedImageCrop:
             return {'total_crops': 0, 'ng_crops': 0, 'ok_crops': 0}
 
         # 解析XML标签
-        annotations = []
+        names, boxes, kinds = _empty_annotations()
         if xml_path is not None and os.path.exists(xml_path):
-            annotations = self._parse_xml(xml_path, original_size)
-            if self.verbose:
-                self.logger.info(f"解析到 {len(annotations)} 个标注")
-                for name, box in annotations:
-                    if name.endswith('U4U'):
-                        self.logger.info(f"U4U缺陷: 原始大小={(box[2] - box[0])}x{(box[3] - box[1])}")
+            names, boxes, kinds = self._parse_xml(xml_path, original_size)
         elif xml_path is not None:
             self.logger.warning(f"XML文件不存在: {xml_path}")
 
+        if self.verbose and len(names):
+            self.logger.info(f"解析到 {len(names)} 个标注")
+            u4u = kinds == _KIND_U4U
+            for width, height in (boxes[u4u, 2:] - boxes[u4u, :2]).tolist():
+                self.logger.info(f"U4U缺陷: 原始大小={width}x{height}")
+
         # 获取文件名
         base_name = os.path.splitext(os.path.basename(image_path))[0]
 
@@ -631,16 +1226,26 @@ class TaggedImageCrop:
             'ok_crops': 0   # 无缺陷的裁剪块
         }
 
-        # 对图像进行裁剪
-        crops = sliding_crop_image(image, self.crop_size, self.stride)
-        stats['total_crops'] = len(crops)
-
-        for idx, (crop_img, x, y) in enumerate(crops):
-            # 更新标签
-            cropped_labels = []
-            if annotations:  # 只在有原始标注时才处理
-                cropped_labels = self._update_labels_for_crop(annotations, x, y, self.crop_size)
+        # 对图像进行裁剪：裁剪块逐个产生，裁剪位置预先算出供标签计算使用
+        if self.target_size and self.resize_per_crop:
+            target_w, target_h = self.target_size
+            offsets = _crop_offsets(target_h, target_w, self.crop_size, self.stride)
+            crops = self._sliding_crop_resized(image)
+        else:
+            offsets = _crop_offsets(image.shape[0], image.shape[1], self.crop_size, self.stride)
+            crops = sliding_crop_image(image, self.crop_size, self.stride, return_list=False)
+        stats['total_crops'] = len(offsets)
+        pending_writes = []
+        prefixes = self._save_prefixes(base_name) if self.save_dir else None
+
+        if len(names) == 0 and not self.retrain_no_detect and not self.save_only_ok:
+            # 没有标注且不保留无缺陷的裁剪块：没有裁剪块需要保存，跳过逐块处理
+            crops, crop_labels = (), ()
+        else:
+            # 一次性计算所有裁剪块的标签
+            crop_labels = self._update_labels_for_crops(names, boxes, kinds, offsets, self.crop_size)
 
+        for idx, ((crop_img, x, y), cropped_labels) in enumerate(zip(crops, crop_labels)):
             has_labels = len(cropped_labels) > 0
 
             # 判断是否需要保存
@@ -658,7 +1263,9 @@ class TaggedImageCrop:
 
             if should_save:
                 # 保存裁剪块
-                self._save(crop_img, cropped_labels, base_name, idx)
+                write_futures = self._save(crop_img, cropped_labels, base_name, idx, prefixes)
+                if write_futures:
+                    pending_writes.extend(write_futures)
 
                 # 更新统计
                 if has_labels:
@@ -666,6 +1273,13 @@ class TaggedImageCrop:
                 else:
                     stats['ok_crops'] += 1
 
+        # 等待本图所有裁剪块的图片和XML写入完成
+        for write_future in pending_writes:
+            try:
+                write_future.result()
+            except Exception as e:
+                self.logger.error(f"保存文件失败: {e}")
+
         if self.verbose:
             self.logger.info(
                 f"处理完成: {base_name} - 总裁剪块: {stats['total_crops']}, "
@@ -677,7 +1291,7 @@ class TaggedImageCrop:
 
 def _single_image_cropping(args, verbose=False):
     """
-    包装单张图片处理逻辑供线程池调用
+    包装单张图片处理逻辑供线程池/进程池调用
 
     Args:
         args: 包含 (img_path, processor_instance) 的元组
@@ -686,7 +1300,7 @@ def _single_image_cropping(args, verbose=False):
     Returns:
         tuple: (是否成功, 处理结果)
     """
-    logger = set_logging("single_image_cropping", verbose=verbose)
+    logger = _get_logger("single_image_cropping", verbose=verbose)
     img_path, processor = args
 
     # 查找对应的XML文件
@@ -705,15 +1319,50 @@ def _single_image_cropping(args, verbose=False):
         return False, None
 
 
-def batch_multithreaded_image_cropping(img_path_list, processor, max_workers=10, verbose=False):
+def _init_cropping_worker():
+    """
+    进程池子进程初始化：并行由进程池负责，OpenCV和numba内部只用单线程
+    """
+    global _IN_POOL_WORKER
+    _IN_POOL_WORKER = True
+    cv2.setNumThreads(1)
+
+
+def _crop_image_chunk(img_paths, processor, verbose=False):
+    """
+    顺序处理一组图片，处理当前图片时在后台预读取下一张，供进程池按组调用
+
+    Args:
+        img_paths: 图片路径列表
+        processor: TaggedImageCrop 实例
+        verbose: 是否显示详细日志
+
+    Returns:
+        list: 每张图片的 (是否成功, 处理结果)
     """
-    批量多线程处理图像裁剪任务
+    results = []
+    for i, img_path in enumerate(img_paths):
+        if i + 1 < len(img_paths):
+            processor._prefetch_image(img_paths[i + 1])
+        results.append(_single_image_cropping((img_path, processor), verbose))
+    return results
+
+
+def batch_multithreaded_image_cropping(img_path_list, processor, max_workers=10, verbose=False, use_processes=True):
+    """
+    批量并行处理图像裁剪任务
+
+    默认使用进程池，标签计算等Python逻辑不受GIL限制，可随CPU核心数扩展；
+    processor 会被序列化后传给子进程（日志记录器、后台写线程在子进程中重新创建）。
+    Windows等以spawn方式启动子进程的平台上，调用代码需放在 if __name__ == '__main__': 保护之下；
+    交互式环境（如Jupyter）或无法使用多进程时可设置 use_processes=False 改用线程池。
 
     Args:
         img_path_list: 待处理的图片路径列表，每个元素为图片的完整文件路径
         processor: TaggedImageCrop 实例
-        max_workers: 最大线程数（建议设为CPU核心数*2）
+        max_workers: 最大并行数，建议设为CPU核心数（并行期间OpenCV内部限制为单线程，不再与工作线程/进程叠加）
         verbose: 是否显示详细日志
+        use_processes: 是否使用进程池，False时使用线程池
 
     Example:
         >>> processor = TaggedImageCrop(...)
@@ -722,7 +1371,7 @@ def batch_multithreaded_image_cropping(img_path_list, processor, max_workers=10,
         Processing image cropping: 100%|██████████| 3/3 [00:05<00:00, 1.67s/it]
         Completed: 3/3 (100.0%)
     """
-    logger = set_logging("batch_multithreaded_image_cropping", verbose=verbose)
+    logger = _get_logger("batch_multithreaded_image_cropping", verbose=verbose)
 
     if not img_path_list:
         logger.warning("没有图片需要处理")
@@ -747,30 +1396,44 @@ def batch_multithreaded_image_cropping(img_path_list, processor, max_workers=10,
         'total_ok': 0
     }
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # 使用列表推导式创建futures
-        futures = [executor.submit(_single_image_cropping, args, verbose) for args in task_args]
+    # 检查sys.stdout是否为None，避免tqdm写入错误
+    import sys
+    disable_tqdm = sys.stdout is None
+
+    if use_processes:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, initializer=_init_cropping_worker)
+        cv2_threads = contextlib.nullcontext()
+    else:
+        # 并行由线程池负责，OpenCV内部只用单线程
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        cv2_threads = cv2_num_threads(1)
+
+    with cv2_threads, executor:
+        if use_processes:
+            # 按组分发图片以摊薄进程间通信开销，组内处理当前图片时预读取下一张
+            chunksize = max(1, len(img_path_list) // (max_workers * 4))
+            chunks = [img_path_list[i:i + chunksize] for i in range(0, len(img_path_list), chunksize)]
+            futures = [executor.submit(_crop_image_chunk, chunk, processor, verbose) for chunk in chunks]
+        else:
+            futures = [executor.submit(_single_image_cropping, args, verbose) for args in task_args]
 
-        # 检查sys.stdout是否为None，避免tqdm写入错误
-        import sys
-        disable_tqdm = sys.stdout is None
-        
         # 使用tqdm显示进度
-        for future in tqdm(
-            concurrent.futures.as_completed(futures),
-            total=len(futures),
-            desc="批量裁剪进度",
-            disable=disable_tqdm
-        ):
-            try:
-                success, stats = future.result()
-                if success and stats:
-                    total_stats['success_count'] += 1
-                    total_stats['total_crops'] += stats.get('total_crops', 0)
-                    total_stats['total_ng'] += stats.get('ng_crops', 0)
-                    total_stats['total_ok'] += stats.get('ok_crops', 0)
-            except Exception as e:
-                logger.error(f"处理结果时出错: {e}")
+        with tqdm(total=len(task_args), desc="批量裁剪进度", disable=disable_tqdm) as pbar:
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"处理结果时出错: {e}")
+                    continue
+                if not use_processes:
+                    results = [results]
+                for success, stats in results:
+                    if success and stats:
+                        total_stats['success_count'] += 1
+                        total_stats['total_crops'] += stats.get('total_crops', 0)
+                        total_stats['total_ng'] += stats.get('ng_crops', 0)
+                        total_stats['total_ok'] += stats.get('ok_crops', 0)
+                pbar.update(len(results))
 
     # 输出总统计
     logger.info("\n处理完成!")
@@ -779,4 +1442,4 @@ def batch_multithreaded_image_cropping(img_path_list, processor, max_workers=10,
     logger.info(f"有目标块: {total_stats['total_ng']}")
     logger.info(f"无目标块: {total_stats['total_ok']}")
 
-    return total_stats
\ No newline at end of file
+    return total_stats
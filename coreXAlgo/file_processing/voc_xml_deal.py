@@ -1,13 +1,161 @@
 import os
-import xml.etree.ElementTree as ET
-from typing import Dict, List, Optional, Union, Set, Any
+import re
+import sys
+import stat
+from typing import Dict, List, Optional, Union, Set, Any, Iterable
 from tqdm import tqdm
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from lxml import etree
 
 from ..utils.basic import set_logging
+from ..utils.io_util import atomic_write_bytes
 from .basic import get_files
 
+# 预编译的 XPath：每个 object 的第一个 name 文本，以及 object 数量，由 C 层直接返回结果
+_OBJECT_NAMES = etree.XPath('object/name[1]/text()[1]', smart_strings=False)
+_COUNT_OBJECTS = etree.XPath('count(object)')
+
+_XML_ENCODING_DECL = re.compile(rb'^\s*<\?xml[^>]*?encoding\s*=\s*["\']([A-Za-z0-9._-]+)["\']')
+_UTF8_ENCODINGS = {b'utf-8', b'utf8', b'us-ascii', b'ascii'}
+
+
+def _parse_xml_file(xml_path: str):
+    """
+    一次性读入文件字节后交给 lxml 解析，比 etree.parse(path) 由 libxml2 分块读取文件更快
+    """
+    with open(xml_path, 'rb') as f:
+        data = f.read()
+    return etree.fromstring(data, base_url=xml_path).getroottree()
+
+
+def _may_contain_categories(data: bytes, categories: Iterable[str]) -> bool:
+    """
+    在字节层面粗筛 XML 内容是否可能包含指定类别，用于跳过无需修改的文件
+
+    只在能确定结果时返回 False：文件为 UTF-8 兼容编码、不含实体或字符引用，
+    且任何类别（按 XML 转义后的 UTF-8 字节）都不在内容中出现；其余情况一律返回 True，交给完整解析判断。
+    """
+    if b'&' in data or data.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return True
+    match = _XML_ENCODING_DECL.match(data)
+    if match and match.group(1).lower() not in _UTF8_ENCODINGS:
+        return True
+    for category in categories:
+        if category.replace('&', '&amp;').replace('<', '&lt;').encode('utf-8') in data:
+            return True
+    return False
+
+
+def _call_process_func(xml_file: str, process_func, args: tuple, kwargs: dict):
+    """
+    在进程池子进程中调用处理函数，捕获异常后返回给主进程记录，单个文件出错不影响其余文件
+
+    Returns:
+        tuple: (处理结果, 错误信息)，成功时错误信息为None
+    """
+    try:
+        return process_func(xml_file, *args, **kwargs), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _has_objects(xml_path: str) -> bool:
+    """
+    判断 XML 根节点下是否存在 <object>，读到第一个 <object> 即停止解析
+
+    Args:
+        xml_path: XML 标注文件路径
+
+    Returns:
+        bool: 是否存在标注对象
+    """
+    root = None
+    for _, elem in etree.iterparse(xml_path, events=('start',)):
+        if root is None:
+            root = elem
+        elif elem.tag == 'object' and elem.getparent() is root:
+            return True
+    return False
+
+
+def _has_categories(xml_path: str, categories: Set[str]) -> bool:
+    """
+    判断 XML 中是否存在类别属于 categories 的 <object>，找到第一个即停止解析
+
+    与 findall('object') + findtext('name') 的判断一致：只检查根节点下 <object> 的第一个 <name>。
+
+    Args:
+        xml_path: XML 标注文件路径
+        categories: 目标类别集合
+
+    Returns:
+        bool: 是否包含目标类别
+    """
+    root = None
+    for event, elem in etree.iterparse(xml_path, events=('start', 'end')):
+        if root is None:
+            root = elem
+        elif event == 'end' and elem.tag == 'name':
+            obj = elem.getparent()
+            if (obj.tag == 'object' and obj.getparent() is root and obj.find('name') is elem
+                    and (elem.text or '') in categories):
+                return True
+    return False
+
+
+def _path_is_dir(path: str) -> Optional[bool]:
+    """
+    用一次 os.stat 同时完成存在性和目录判断，代替 exists() + is_dir() 两次系统调用
+
+    Returns:
+        Optional[bool]: 路径不存在（或无法访问）时返回 None，否则返回是否为目录
+    """
+    try:
+        return stat.S_ISDIR(os.stat(path).st_mode)
+    except (OSError, ValueError):
+        return None
+
+
+def _file_stem(file_path: str) -> str:
+    """
+    纯字符串方式取文件名（不含扩展名），规则与 Path(file_path).stem 相同，但不创建 Path 对象
+    """
+    name = os.path.basename(file_path)
+    i = name.rfind('.')
+    return name[:i] if 0 < i < len(name) - 1 else name
+
+
+def _largest_first(xml_files: List[str]) -> List[int]:
+    """
+    按文件大小从大到小返回文件下标，先派发大文件，避免它们落在队尾拖长整体耗时
+
+    Args:
+        xml_files: XML 文件路径列表
+
+    Returns:
+        List[int]: 排序后的文件下标，大小相同的文件保持原有顺序
+    """
+    sizes = []
+    for xml_file in xml_files:
+        try:
+            sizes.append(os.stat(xml_file).st_size)
+        except OSError:
+            sizes.append(0)
+    return sorted(range(len(xml_files)), key=sizes.__getitem__, reverse=True)
+
+
+def _stem_if_has_categories(xml_path: str, categories: frozenset) -> Optional[str]:
+    """
+    批量查找时的单文件处理函数：包含目标类别时返回文件名（不含扩展名），否则返回 None
+    """
+    if _has_categories(xml_path, categories):
+        return _file_stem(xml_path)
+    return None
+
 
 class VOCXMLProcessor:
     """
@@ -23,15 +171,23 @@ class VOCXMLProcessor:
         7. 获取详细的标注统计信息
     """
     
-    def __init__(self, verbose: bool = False):
+    def __init__(self, verbose: bool = False, show_progress: bool = True):
         """
         初始化 VOC XML 处理器
         
         Args:
             verbose: 是否启用详细日志
+            show_progress: 是否显示进度条，关闭后批量处理不产生任何进度条开销
         """
         self.verbose = verbose
+        self.show_progress = show_progress
         self.logger = set_logging("VOCXMLProcessor", verbose=verbose)
+
+    def _progress(self, iterable=None, **kwargs):
+        """
+        创建进度条，限制刷新频率，文件很多时避免进度条刷新本身成为开销
+        """
+        return tqdm(iterable, mininterval=0.5, disable=not self.show_progress, **kwargs)
     
     def update_categories(self, xml_path: str, source_categories: List[str], target_categories: List[str]) -> int:
         """
@@ -69,19 +225,24 @@ class VOCXMLProcessor:
         if len(source_categories) != len(target_categories):
             raise ValueError("Source and target categories must have the same length")
         
-        xml_path_obj = Path(xml_path)
-        if not xml_path_obj.exists():
+        is_dir = _path_is_dir(xml_path)
+        if is_dir is None:
             raise FileNotFoundError(f"Path not found: {xml_path}")
         
+        # 源类别到目标类别的映射只构建一次；源类别重复时以第一次出现的为准
+        category_map = {}
+        for source, target in zip(source_categories, target_categories):
+            category_map.setdefault(source, target)
+        
         # 检查是否为目录
-        if xml_path_obj.is_dir():
+        if is_dir:
             # 获取目录下所有 XML 文件（包括子目录）
             xml_files = get_files(xml_path, '.xml')
             total_updated = 0
             
-            for file_path in tqdm(xml_files, desc="Updating categories in XML files"):
+            for file_path in self._progress(xml_files, desc="Updating categories in XML files"):
                 try:
-                    updated = self._update_single_file_categories(file_path, source_categories, target_categories)
+                    updated = self._update_single_file_categories(file_path, category_map)
                     total_updated += updated
                 except Exception as e:
                     self.logger.error(f"Error processing {file_path}: {str(e)}")
@@ -90,37 +251,44 @@ class VOCXMLProcessor:
             return total_updated
         else:
             # 处理单个文件
-            return self._update_single_file_categories(xml_path, source_categories, target_categories)
+            return self._update_single_file_categories(xml_path, category_map)
     
-    def _update_single_file_categories(self, xml_path: str, source_categories: List[str], target_categories: List[str]) -> int:
+    def _update_single_file_categories(self, xml_path: str, category_map: Dict[str, str]) -> int:
         """
         更新单个 XML 文件中的类别名称
         
         Args:
             xml_path: XML 标注文件的完整路径
-            source_categories: 需要被替换的原始类别名称列表
-            target_categories: 替换后的目标类别名称列表
+            category_map: 原始类别名称到目标类别名称的映射
         
         Returns:
             int: 更新的类别数量
         """
+        with open(xml_path, 'rb') as f:
+            data = f.read()
+
+        # 大多数文件不含待替换类别，字节层面即可排除，无需构建 DOM
+        if not _may_contain_categories(data, category_map):
+            return 0
+
         # 解析 XML 文件
-        tree = ET.parse(xml_path)
+        tree = etree.fromstring(data, base_url=xml_path).getroottree()
         updated_count = 0
         
         # 遍历 XML 文件中的所有 <object> 标签，修改对应的类别名
         for obj in tree.findall('object'):
             name = obj.find('name')
-            if name is not None and name.text in source_categories:
-                index = source_categories.index(name.text)
-                self.logger.info(f"Updating category in {xml_path}: '{source_categories[index]}' → '{target_categories[index]}'")
-                name.text = target_categories[index]
+            if name is not None and name.text in category_map:
+                target = category_map[name.text]
+                self.logger.info(f"Updating category in {xml_path}: '{name.text}' → '{target}'")
+                name.text = target
                 updated_count += 1
         
-        # 如果有更新才写回文件
+        # 如果有更新才写回文件，保持原文件是否带 XML 声明的状态
         if updated_count > 0:
+            has_declaration = data.startswith((b'<?xml', b'\xef\xbb\xbf<?xml'))
             try:
-                tree.write(xml_path, encoding='utf-8', xml_declaration=True)
+                atomic_write_bytes(xml_path, etree.tostring(tree, encoding='UTF-8', xml_declaration=has_declaration))
             except Exception as e:
                 raise IOError(f"Failed to write XML file: {e}")
         
@@ -153,24 +321,22 @@ class VOCXMLProcessor:
             ...     print(f"  - {image}")
         """
         try:
-            xml_path_obj = Path(xml_path)
-            if not xml_path_obj.exists():
+            is_dir = _path_is_dir(xml_path)
+            if is_dir is None:
                 self.logger.warning(f"Path not found: {xml_path}")
-                return None if xml_path_obj.is_file() else []
+                return []
             
             # 检查是否为目录
-            if xml_path_obj.is_dir():
+            if is_dir:
                 # 获取目录下所有 XML 文件（包括子目录）
                 xml_files = get_files(xml_path, '.xml')
                 result_list = []
                 
-                for file_path in tqdm(xml_files, desc="Processing XML files"):
+                for file_path in self._progress(xml_files, desc="Processing XML files"):
                     try:
-                        # 解析 XML 文件
-                        tree = ET.parse(file_path)
-                        
-                        if len(tree.findall('object')) == 0:
-                            result_list.append(Path(file_path).stem)
+                        # 流式解析，读到第一个 <object> 即可判定
+                        if not _has_objects(file_path):
+                            result_list.append(_file_stem(file_path))
                     except Exception as e:
                         self.logger.error(f"Error processing {file_path}: {str(e)}")
                         continue
@@ -178,11 +344,9 @@ class VOCXMLProcessor:
                 return result_list
             else:
                 # 处理单个文件
-                # 解析 XML 文件
-                tree = ET.parse(xml_path)
-                
-                if len(tree.findall('object')) == 0:
-                    return xml_path_obj.stem
+                # 流式解析，读到第一个 <object> 即可判定
+                if not _has_objects(xml_path):
+                    return _file_stem(xml_path)
                 return None
         except Exception as e:
             self.logger.error(f"Error processing {xml_path}: {str(e)}")
@@ -211,35 +375,7 @@ class VOCXMLProcessor:
             >>> for class_name, count in sorted_stats:
             ...     print(f"  {class_name}: {count}")
         """
-        classes_and_nums = {}
-        xml_dir_obj = Path(xml_dir)
-        
-        if not xml_dir_obj.exists():
-            self.logger.warning(f"Directory not found: {xml_dir}")
-            return classes_and_nums
-        
-        # 使用 get_files 函数获取目录下所有 XML 文件（支持递归搜索）
-        xml_files = get_files(xml_dir, '.xml')
-        
-        for xml_path in tqdm(xml_files, desc="Defect category and quantity statistics"):
-            try:
-                tree = ET.parse(xml_path)
-                for obj in tree.findall('object'):
-                    name_elem = obj.find('name')
-                    if name_elem is not None and name_elem.text:
-                        class_name = name_elem.text
-                        if class_name not in classes_and_nums:
-                            classes_and_nums[class_name] = 1
-                        else:
-                            classes_and_nums[class_name] += 1
-            except ET.ParseError as e:
-                self.logger.warning(f"XML parsing error, skipping file {xml_path}: {str(e)}")
-                continue
-            except Exception as e:
-                self.logger.warning(f"Error processing file {xml_path}: {str(e)}")
-                continue
-        
-        return classes_and_nums
+        return self.analyze_directory(xml_dir, collect_image_categories=False).get('class_counts', {})
     
     def get_images_with_specific_categories(self, xml_path: str, target_categories: Union[str, List[str], Set[str]]) -> Union[Optional[str], List[str]]:
         """
@@ -276,10 +412,10 @@ class VOCXMLProcessor:
             ...     print(f"  - {image}")
         """
         try:
-            xml_path_obj = Path(xml_path)
-            if not xml_path_obj.exists():
+            is_dir = _path_is_dir(xml_path)
+            if is_dir is None:
                 self.logger.warning(f"Path not found: {xml_path}")
-                return None if xml_path_obj.is_file() else []
+                return []
             
             # 标准化目标类别为集合
             if isinstance(target_categories, str):
@@ -288,23 +424,16 @@ class VOCXMLProcessor:
                 target_categories_set = set(target_categories)
             
             # 检查是否为目录
-            if xml_path_obj.is_dir():
+            if is_dir:
                 # 获取目录下所有 XML 文件（包括子目录）
                 xml_files = get_files(xml_path, '.xml')
                 result_list = []
                 
-                for file_path in tqdm(xml_files, desc="Processing XML files"):
+                for file_path in self._progress(xml_files, desc="Processing XML files"):
                     try:
-                        # 解析 XML 文件
-                        tree = ET.parse(file_path)
-                        
-                        existing_categories = {
-                            obj.findtext('name') for obj in tree.findall('object') 
-                            if obj.find('name') is not None
-                        }
-                        
-                        if target_categories_set & existing_categories:
-                            result_list.append(Path(file_path).stem)
+                        # 流式解析，找到第一个目标类别即可判定
+                        if _has_categories(file_path, target_categories_set):
+                            result_list.append(_file_stem(file_path))
                     except Exception as e:
                         self.logger.error(f"Error processing {file_path}: {str(e)}")
                         continue
@@ -312,21 +441,53 @@ class VOCXMLProcessor:
                 return result_list
             else:
                 # 处理单个文件
-                # 解析 XML 文件
-                tree = ET.parse(xml_path)
-                
-                existing_categories = {
-                    obj.findtext('name') for obj in tree.findall('object') 
-                    if obj.find('name') is not None
-                }
-                
-                if target_categories_set & existing_categories:
-                    return xml_path_obj.stem
+                # 流式解析，找到第一个目标类别即可判定
+                if _has_categories(xml_path, target_categories_set):
+                    return _file_stem(xml_path)
                 return None
         except Exception as e:
             self.logger.error(f"Error processing {xml_path}: {str(e)}")
             return None if Path(xml_path).is_file() else []
     
+    def get_images_with_specific_categories_batch(self, xml_dir: str,
+                                                  target_categories: Union[str, List[str], Set[str]],
+                                                  max_workers: int = 4, use_processes: bool = False) -> List[str]:
+        """
+        并行提取目录中包含特定类别的图片
+
+        目标类别只在开始时标准化为 frozenset 一次，之后原样传给每个文件的处理函数，
+        frozenset 可直接在线程间共享，也可以发送到子进程。
+
+        Args:
+            xml_dir: 包含 XML 标注文件的目录路径
+            target_categories: 需要查找的目标类别
+            max_workers: 最大线程数或进程数
+            use_processes: 为 True 时使用多进程（batch_process_with_processes），否则使用多线程
+
+        Returns:
+            List[str]: 包含目标类别的所有图片名称列表（不含扩展名）
+
+        Example:
+            >>> # 多线程查找包含 person 或 car 的图片
+            >>> images = processor.get_images_with_specific_categories_batch('annotations/', ['person', 'car'])
+            >>> print(f"Found {len(images)} images")
+            >>>
+            >>> # 文件很多时使用多进程
+            >>> images = processor.get_images_with_specific_categories_batch(
+            ...     'annotations/', 'person', max_workers=8, use_processes=True
+            ... )
+        """
+        if isinstance(target_categories, str):
+            target_categories_set = frozenset((target_categories,))
+        else:
+            target_categories_set = frozenset(target_categories)
+
+        if use_processes:
+            return self.batch_process_with_processes(xml_dir, _stem_if_has_categories, target_categories_set,
+                                                     max_workers=max_workers)
+        return self.batch_process_with_threads(xml_dir, _stem_if_has_categories, target_categories_set,
+                                               max_workers=max_workers)
+
     def get_all_categories_and_images(self, xml_path: str) -> Optional[Dict[str, List[str]]]:
             """
             解析XML文件，返回该文件中包含的所有类别和对应的图片名
@@ -349,13 +510,12 @@ class VOCXMLProcessor:
                 ...     print("No valid data found in XML file")
             """
             try:
-                xml_path_obj = Path(xml_path)
-                if not xml_path_obj.exists():
+                # 解析XML文件，文件不存在时由 open 直接抛出 FileNotFoundError，无需预先检查
+                try:
+                    tree = _parse_xml_file(xml_path)
+                except FileNotFoundError:
                     self.logger.warning(f"XML file not found: {xml_path}")
                     return None
-
-                # 解析XML文件
-                tree = ET.parse(xml_path)
                 root = tree.getroot()
 
                 # 获取图片名（从filename标签）
@@ -385,11 +545,11 @@ class VOCXMLProcessor:
                     if name_elem is not None and name_elem.text:
                         category = name_elem.text.strip()
                         if category:  # 确保类别名不为空
-                            categories.add(category)
+                            categories.add(sys.intern(category))
 
                 return {image_name: list(categories)}
 
-            except ET.ParseError as e:
+            except etree.XMLSyntaxError as e:
                 self.logger.error(f"XML parsing error in {xml_path}: {str(e)}")
                 return None
             except Exception as e:
@@ -423,7 +583,7 @@ class VOCXMLProcessor:
         xml_files = get_files(xml_dir, '.xml')
         all_data = {}
 
-        for xml_file in tqdm(xml_files, desc="Batch parsing XML files"):
+        for xml_file in self._progress(xml_files, desc="Batch parsing XML files"):
             result = self.get_all_categories_and_images(xml_file)
             if result:
                 all_data[xml_file] = result
@@ -536,7 +696,7 @@ class VOCXMLProcessor:
         xml_files = get_files(xml_dir, '.xml')
         results = []
         
-        for xml_file in tqdm(xml_files, desc="Batch processing XML files"):
+        for xml_file in self._progress(xml_files, desc="Batch processing XML files"):
             result = process_func(xml_file, *args, **kwargs)
             if result:
                 results.append(result)
@@ -583,23 +743,90 @@ class VOCXMLProcessor:
         xml_files = get_files(xml_dir, '.xml')
         results = []
         
-        # 使用多线程处理
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for xml_file in xml_files:
-                futures.append(executor.submit(process_func, xml_file, *args, **kwargs))
-            
-            # 收集结果
-            for future in tqdm(futures, desc="Multi-thread processing XML files"):
+        # 按文件大小从大到小派发；结果按下标放回，保持与文件列表一致的顺序
+        order = _largest_first(xml_files)
+        slots = [None] * len(xml_files)
+
+        # 使用多线程处理，最多保留 max_workers * 4 个在途任务，避免一次性为全部文件创建 Future
+        max_in_flight = max(1, max_workers) * 4
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                self._progress(total=len(xml_files), desc="Multi-thread processing XML files") as pbar:
+            pending = deque()
+
+            def collect(index, future):
                 try:
-                    result = future.result()
-                    if result:
-                        results.append(result)
+                    slots[index] = future.result()
                 except Exception as e:
                     self.logger.error(f"Error in thread: {str(e)}")
-        
-        return results
-    
+                pbar.update(1)
+
+            for index in order:
+                if len(pending) >= max_in_flight:
+                    collect(*pending.popleft())
+                pending.append((index, executor.submit(process_func, xml_files[index], *args, **kwargs)))
+
+            # 收集剩余结果
+            while pending:
+                collect(*pending.popleft())
+
+        return [result for result in slots if result]
+
+    def batch_process_with_processes(self, xml_dir: str, process_func, *args, max_workers: Optional[int] = None,
+                                     chunksize: int = 32, **kwargs) -> List:
+        """
+        多进程批量处理目录中的 XML 文件
+
+        XML 解析主要占用 CPU 且持有 GIL，多线程难以并行；多进程可随 CPU 核心数扩展。
+        process_func 及其参数需要能被 pickle（模块级函数，或 VOCXMLProcessor 等可序列化实例的方法）。
+        Windows 等以 spawn 方式启动子进程的平台上，调用代码需放在 if __name__ == '__main__': 保护之下。
+
+        Args:
+            xml_dir: 包含 XML 标注文件的目录路径
+            process_func: 处理单个 XML 文件的函数
+            *args: 传递给处理函数的位置参数
+            max_workers: 最大进程数，None 时使用 CPU 核心数
+            chunksize: 每次发送给子进程的文件数，文件较多时增大可减少进程间通信开销
+            **kwargs: 传递给处理函数的关键字参数
+
+        Returns:
+            List: 处理结果列表
+
+        Example:
+            >>> # 多进程批量查找无标注的图片
+            >>> empty_files = processor.batch_process_with_processes(
+            ...     'annotations/', processor.get_images_without_annotations, max_workers=8
+            ... )
+            >>> print(f"Found {len(empty_files)} images without annotations")
+            >>>
+            >>> # 多进程批量处理并传递参数
+            >>> person_images = processor.batch_process_with_processes(
+            ...     'annotations/', processor.get_images_with_specific_categories, 'person'
+            ... )
+        """
+        xml_dir_obj = Path(xml_dir)
+        if not xml_dir_obj.exists():
+            self.logger.warning(f"Directory not found: {xml_dir}")
+            return []
+
+        # 获取目录下所有 XML 文件（包括子目录）
+        xml_files = get_files(xml_dir, '.xml')
+        # 按文件大小从大到小派发；结果按下标放回，保持与文件列表一致的顺序
+        order = _largest_first(xml_files)
+        slots = [None] * len(xml_files)
+
+        worker = partial(_call_process_func, process_func=process_func, args=args, kwargs=kwargs)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for index, (result, error) in zip(
+                    order,
+                    self._progress(executor.map(worker, [xml_files[i] for i in order], chunksize=max(1, chunksize)),
+                         total=len(xml_files), desc="Multi-process processing XML files")):
+                if error is not None:
+                    self.logger.error(f"Error processing {xml_files[index]}: {error}")
+                else:
+                    slots[index] = result
+
+        return [result for result in slots if result]
+
     def get_annotation_statistics(self, xml_dir: str) -> Dict[str, Any]:
         """
         获取标注统计信息
@@ -623,41 +850,79 @@ class VOCXMLProcessor:
             >>> for file in stats['empty_files']:
             ...     print(f"  - {file}")
         """
+        return self.analyze_directory(xml_dir, collect_image_categories=False)
+
+    def analyze_directory(self, xml_dir: str, collect_image_categories: bool = True) -> Dict[str, Any]:
+        """
+        单次遍历目录，一次性收集各类统计信息
+
+        每个 XML 只解析一次，同时得到类别计数、无标注文件和每张图片包含的类别，
+        需要多项统计时可避免重复读取和解析同一批文件。
+        get_defect_classes_and_nums 和 get_annotation_statistics 均基于此方法。
+
+        Args:
+            xml_dir: 包含 XML 标注文件的目录路径
+            collect_image_categories: 是否收集每张图片包含的类别，只需要汇总统计时可关闭以省去逐文件的集合
+
+        Returns:
+            Dict[str, Any]: 统计信息字典，目录不存在时返回空字典
+                - total_files: XML 文件总数
+                - total_objects: 标注对象总数
+                - class_counts: 类别名称到出现次数的映射
+                - empty_files: 无标注的图片名称列表（不含扩展名）
+                - avg_objects_per_file: 平均每个文件的标注对象数
+                - image_categories: XML 相对 xml_dir 的路径（不含扩展名，以 '/' 分隔）到其包含类别集合的映射，
+                  顶层文件即为文件名；collect_image_categories 为 False 时不包含此项
+
+        Example:
+            >>> report = processor.analyze_directory('annotations/')
+            >>> print(f"Total objects: {report['total_objects']}")
+            >>> print(f"Empty files: {len(report['empty_files'])}")
+            >>>
+            >>> # 基于同一次遍历的结果筛选包含指定类别的图片，无需重新解析
+            >>> targets = {'person', 'car'}
+            >>> images = [name for name, names in report['image_categories'].items() if names & targets]
+        """
         xml_dir_obj = Path(xml_dir)
         if not xml_dir_obj.exists():
             self.logger.warning(f"Directory not found: {xml_dir}")
             return {}
-        
+
         # 获取目录下所有 XML 文件（包括子目录）
         xml_files = get_files(xml_dir, '.xml')
         total_files = len(xml_files)
         total_objects = 0
-        class_counts = {}
+        class_counts = Counter()
         empty_files = []
-        
-        for xml_file in tqdm(xml_files, desc="Calculating annotation statistics"):
+        image_categories = {} if collect_image_categories else None
+
+        for xml_file in self._progress(xml_files, desc="Analyzing annotation directory"):
             try:
-                tree = ET.parse(xml_file)
-                objects = tree.findall('object')
-                object_count = len(objects)
-                total_objects += object_count
-                
-                if object_count == 0:
-                    empty_files.append(Path(xml_file).stem)
-                else:
-                    for obj in objects:
-                        name_elem = obj.find('name')
-                        if name_elem is not None and name_elem.text:
-                            class_name = name_elem.text
-                            class_counts[class_name] = class_counts.get(class_name, 0) + 1
+                root = _parse_xml_file(xml_file).getroot()
             except Exception as e:
                 self.logger.warning(f"Error processing {xml_file}: {str(e)}")
                 continue
-        
-        return {
+
+            object_count = int(_COUNT_OBJECTS(root))
+            total_objects += object_count
+            if object_count == 0:
+                empty_files.append(_file_stem(xml_file))
+
+            # 驻留类别名，image_categories 中同名类别共用同一个字符串对象
+            class_names = list(map(sys.intern, _OBJECT_NAMES(root)))
+            class_counts.update(class_names)
+            if image_categories is not None:
+                # 按相对路径区分不同子目录下的同名文件
+                rel_path = os.path.splitext(os.path.relpath(xml_file, xml_dir))[0]
+                image_categories[rel_path.replace(os.sep, '/')] = set(class_names)
+
+        report = {
             'total_files': total_files,
             'total_objects': total_objects,
-            'class_counts': class_counts,
+            'class_counts': dict(class_counts),
             'empty_files': empty_files,
             'avg_objects_per_file': total_objects / total_files if total_files > 0 else 0
         }
+        if image_categories is not None:
+            report['image_categories'] = image_categories
+        return report
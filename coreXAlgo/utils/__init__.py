@@ -8,6 +8,7 @@
 - 数据库客户端（mt_db_client）：数据库操作
 - 文件下载器（mt_file_downloader）：批量FTP/SFTP下载
 - 常量定义（constants）：通用常量
+- 读写辅助（io_util）：各模块共享的文件与图像读写辅助函数
 
 Copyright (C) 2025 Xxin_BOE
 """
@@ -36,6 +37,7 @@ basic_all = [
 
 bbox_util_all = [
     'polygon_to_bbox',
+    'polygons_to_bboxes',
     'draw_bboxes_on_img',
     'draw_bboxes_on_img_pro',
     'draw_polygons_on_img_pro',
@@ -1,4 +1,5 @@
 import os
+import threading
 
 try:
     from typing import Dict, Tuple, Union, Optional, List, Literal
@@ -34,6 +35,13 @@ def polygon_to_bbox(polygon):
     if len(polygon) < 4:
         raise ValueError("Polygon must have at least 2 points (4 coordinates)")
 
+    # Fast path for flat numeric arrays: reduce the strided x/y views in the native dtype and
+    # cast only the four results (float32 rounding is monotonic, so min/max commute with it)
+    if isinstance(polygon, np.ndarray) and polygon.ndim == 1 and polygon.dtype.kind in 'biuf':
+        coords = polygon[:polygon.size & ~1]
+        xs, ys = coords[0::2], coords[1::2]
+        return [np.float32(xs.min()), np.float32(ys.min()), np.float32(xs.max()), np.float32(ys.max())]
+
     # Ensure even length (ignore last element if odd)
     coords = np.asarray(polygon[:len(polygon) // 2 * 2], dtype=np.float32)
     points = coords.reshape(-1, 2)  # Reshape to [N, 2]
@@ -43,12 +51,58 @@ def polygon_to_bbox(polygon):
     return [l, t, r, b]
 
 
-def cnt_to_polygon(cnt):
+def polygons_to_bboxes(polygons):
+    """
+    Convert many polygons to bounding boxes in one vectorized pass.
+
+    Equivalent to calling polygon_to_bbox on each polygon, but the reductions run once over
+    all coordinates: polygons of equal length are stacked to (N, K, 2), ragged ones are packed
+    into flat x/y arrays and reduced per polygon with np.minimum.reduceat / np.maximum.reduceat.
+
+    Args:
+        polygons: A sequence of polygons, each a flat list or array [x1,y1, x2,y2, ...].
+                  If a polygon has odd length, its last value is ignored.
+
+    Returns:
+        np.ndarray: float32 array of shape (N, 4), one [left, top, right, bottom] row per polygon
+
+    Example:
+        >>> polygons = [[10, 10, 50, 10, 50, 50, 10, 50], [0, 0, 5, 8, 9, 3]]
+        >>> bboxes = polygons_to_bboxes(polygons)
+        >>> print(bboxes)  # 输出: [[10. 10. 50. 50.] [ 0.  0.  9.  8.]]
+    """
+    flat = []
+    for polygon in polygons:
+        coords = np.asarray(polygon, dtype=np.float32).ravel()
+        if coords.size < 4:
+            raise ValueError("Polygon must have at least 2 points (4 coordinates)")
+        flat.append(coords[:coords.size // 2 * 2])
+
+    if not flat:
+        return np.zeros((0, 4), dtype=np.float32)
+
+    sizes = np.fromiter((coords.size for coords in flat), dtype=np.int64, count=len(flat))
+    if (sizes == sizes[0]).all():
+        points = np.stack(flat).reshape(len(flat), -1, 2)
+        return np.concatenate([points.min(axis=1), points.max(axis=1)], axis=1)
+
+    coords = np.concatenate(flat)
+    xs, ys = coords[0::2], coords[1::2]
+    offsets = np.zeros(len(flat), dtype=np.int64)
+    np.cumsum(sizes[:-1] // 2, out=offsets[1:])
+    return np.stack([np.minimum.reduceat(xs, offsets), np.minimum.reduceat(ys, offsets),
+                     np.maximum.reduceat(xs, offsets), np.maximum.reduceat(ys, offsets)], axis=1)
+
+
+def cnt_to_polygon(cnt, buffer_distance=1):
     """
     Convert contour to simplified polygon coordinates.
 
     Args:
         cnt: Input contour as numpy array with shape (N,2)
+        buffer_distance: Distance of the Shapely buffer used to clean the polygon (default 1).
+                         With 0, valid contours are used as-is and only invalid (self-intersecting)
+                         ones are repaired with buffer(0), skipping the costly offset computation.
 
     Returns:
         List of polygon coordinates [x1,y1,x2,y2,...] or empty list if conversion fails
@@ -67,36 +121,54 @@ def cnt_to_polygon(cnt):
 
     try:
         # Convert contour to Shapely Polygon with small buffer for cleaning
-        poly = Polygon(np.asarray(cnt).reshape(-1, 2)).buffer(1)
+        poly = Polygon(np.asarray(cnt).reshape(-1, 2))
+        if buffer_distance or not poly.is_valid:
+            poly = poly.buffer(buffer_distance)
     except (ValueError, AttributeError):
         return []
 
-        # Handle different geometry types
+        # Handle different geometry types; a single polygon is used as-is
     if isinstance(poly, geometry.Polygon):
-        poly = MultiPolygon([poly])
-    elif isinstance(poly, (geometry.LineString, geometry.MultiLineString,
-                           geometry.Point, geometry.MultiPoint,
-                           geometry.GeometryCollection)):
-        return []  # Ignore non-polygon geometries
-
+        max_poly = poly
+    elif isinstance(poly, MultiPolygon):
         # Find largest polygon if multipolygon
-    if isinstance(poly, MultiPolygon):
         max_poly = max(poly.geoms, key=lambda p: p.area, default=None)
         if max_poly is None:
             return []
     else:
-        max_poly = poly
+        return []  # Ignore non-polygon geometries
 
         # Flatten coordinates [x1,y1,x2,y2,...]
-    return [coord for xy in max_poly.exterior.coords for coord in xy]
+    return np.asarray(max_poly.exterior.coords, dtype=np.float64).ravel().tolist()
 
 
-def mask_to_polygon(mask: np.ndarray):
+def _contour_areas(contours) -> np.ndarray:
+    """
+    Compute the areas of all contours in one vectorized shoelace pass.
+
+    Integer contour coordinates make the cross products exact in int64, so the result
+    equals cv2.contourArea for every contour (0 for contours with fewer than 3 points).
+    """
+    counts = np.fromiter((len(cnt) for cnt in contours), dtype=np.int64, count=len(contours))
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+    offsets = np.zeros(len(contours), dtype=np.int64)
+    np.cumsum(counts[:-1], out=offsets[1:])
+
+    # Index of the next point within each contour (wraps back to the contour's first point)
+    next_idx = np.arange(1, len(points) + 1)
+    next_idx[offsets + counts - 1] = offsets
+    x, y = points[:, 0], points[:, 1]
+    cross = x * y[next_idx] - x[next_idx] * y
+    return np.abs(np.add.reduceat(cross, offsets)) * 0.5
+
+
+def mask_to_polygon(mask: np.ndarray, buffer_distance=1):
     """
     Convert binary mask to polygon coordinates.
 
     Args:
         mask (np.ndarray): Binary mask of shape (H,W) where 1 indicates object
+        buffer_distance: Passed to cnt_to_polygon; 0 skips buffering for valid contours
 
     Returns:
         List[float] or None: Polygon coordinates [x1,y1,x2,y2,...] or None if no contour found
@@ -112,22 +184,29 @@ def mask_to_polygon(mask: np.ndarray):
     """
     if not isinstance(mask, np.ndarray) or mask.ndim != 2:
         return None
-    contours, _ = cv2.findContours(mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    # No copy when the mask is already contiguous uint8
+    mask = np.ascontiguousarray(mask, dtype=np.uint8)
+    # Blank masks have no contours; skip the full contour trace
+    if not cv2.countNonZero(mask):
+        return None
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
     if not contours:
         return None
     # Get largest contour by area
-    largest_cnt = max(contours, key=cv2.contourArea)
-    return cnt_to_polygon(largest_cnt)
+    largest_cnt = contours[int(np.argmax(_contour_areas(contours)))]
+    return cnt_to_polygon(largest_cnt, buffer_distance)
 
 
-def mask_to_polygons(mask, area_threshold=25):
+def mask_to_polygons(mask, area_threshold=25, buffer_distance=1):
     """
     Convert binary mask to multiple polygon coordinates.
 
     Args:
         mask: Binary mask of shape (H,W) where 1 indicates object
         area_threshold: Minimum area threshold for including a polygon
+        buffer_distance: Passed to cnt_to_polygon; 0 skips buffering for valid contours
 
     Returns:
         List of polygon coordinates [[x1,y1,x2,y2,...], ...] or None if no valid contours found
@@ -145,17 +224,23 @@ def mask_to_polygons(mask, area_threshold=25):
     if not isinstance(mask, np.ndarray) or mask.ndim != 2:
         return None
 
-    contours, _ = cv2.findContours(mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    # No copy when the mask is already contiguous uint8
+    mask = np.ascontiguousarray(mask, dtype=np.uint8)
+    # Blank masks have no contours; skip the full contour trace
+    if not cv2.countNonZero(mask):
+        return None
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
     if not contours:
         return None
 
+    # Filter small contours with one vectorized area pass before any Shapely work
+    areas = _contour_areas(contours)
     polygons = []
-    for cnt in contours:
-        if cv2.contourArea(cnt) > area_threshold:
-            poly = cnt_to_polygon(cnt)
-            if poly:  # Traditional if statement for Python 3.7+
-                polygons.append(poly)
+    for i in np.flatnonzero(areas > area_threshold):
+        poly = cnt_to_polygon(contours[i], buffer_distance)
+        if poly:  # Traditional if statement for Python 3.7+
+            polygons.append(poly)
 
     return polygons if polygons else None
 
@@ -865,6 +950,11 @@ def merge_detections_industrial(
     return pd.DataFrame(result_data)
 
 
+# 高质量模式复用的 Matplotlib 画布，按线程和图像尺寸缓存
+_HQ_CANVAS_CACHE = threading.local()
+_HQ_CANVAS_CACHE_SIZE = 4
+
+
 class DetectionVisualizer:
     """
     目标检测可视化器 - 集成快速绘制和高质量渲染功能
@@ -894,6 +984,7 @@ class DetectionVisualizer:
     """
 
     COLOR_PALETTE: Dict[str, Tuple[int, int, int]] = {}
+    MPL_COLOR_PALETTE: Dict[str, str] = {}
     DEFAULT_FONT = cv2.FONT_HERSHEY_SIMPLEX
     TEXT_COLOR = (255, 255, 255)
     LABEL_BG_ALPHA = 0.6
@@ -912,6 +1003,7 @@ class DetectionVisualizer:
             detections: List[dict],
             output_path: Optional[str] = None,
             mode: Literal['fast', 'high'] = 'fast',
+            inplace: bool = False,
             **kwargs
     ) -> np.ndarray:
         """
@@ -922,32 +1014,41 @@ class DetectionVisualizer:
             detections: 检测结果列表 [{'label':, 'shapeType':, 'points':, 'result': {}}, ...]
             output_path: 可选输出文件路径
             mode: 渲染模式 'fast'|'high'
+            inplace: 为 True 时直接在输入的彩色图像上绘制并返回该图像，省去整幅图像的复制；
+                     同一幅图像需要多次绘制时建议开启。灰度图、非连续或只读的图像无法原地绘制，始终返回新图像
             **kwargs: 扩展参数
 
         返回:
-            添加了检测可视化的图像副本
+            添加了检测可视化的图像（inplace=False 时为副本）
         """
         if image is None or image.size == 0:
             raise ValueError("输入图像为空")
 
         self._validate_new_detection_format(detections)
 
-        result_img = image.copy()
-        if result_img.ndim == 2:
-            result_img = cv2.cvtColor(result_img, cv2.COLOR_GRAY2BGR)
+        if image.ndim == 2:
+            result_img = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+            inplace = False
+        else:
+            # OpenCV 只能在连续且可写的数组上原地绘制，其余情况退回到在副本上绘制
+            inplace = inplace and image.flags.c_contiguous and image.flags.writeable
+            result_img = image if inplace else image.copy()
 
         try:
             if mode == 'fast':
                 result_img = self._render_fast_mode_new(result_img, detections, **kwargs)
             else:
                 result_img = self._render_high_quality_mode_new(result_img, detections, **kwargs)
+                if inplace:
+                    image[...] = result_img
+                    result_img = image
 
             if output_path:
                 self._save_image(result_img, output_path)
 
         except Exception as e:
             print(f"[可视化错误] 渲染失败: {str(e)}")
-            return image.copy()
+            return image if inplace else image.copy()
 
         return result_img
 
@@ -996,8 +1097,8 @@ class DetectionVisualizer:
 
     @classmethod
     def _render_fast_mode_new(self, image: np.ndarray, detections: List[dict], **kwargs) -> np.ndarray:
-        """快速渲染模式 - 支持新数据格式"""
-        rendered_image = image.copy()
+        """快速渲染模式 - 支持新数据格式，直接在传入的图像上绘制（visualize 已按需复制）"""
+        rendered_image = image
 
         for detection in detections:
             try:
@@ -1318,11 +1419,15 @@ class DetectionVisualizer:
         text_bg_x2 = text_bg_x1 + text_width
         text_bg_y2 = text_bg_y1 + text_height
 
-        # 绘制半透明背景
-        overlay = image.copy()
-        cv2.rectangle(overlay, (text_bg_x1, text_bg_y1),
-                      (text_bg_x2, text_bg_y2), color, -1)
-        cv2.addWeighted(overlay, self.LABEL_BG_ALPHA, image, 1 - self.LABEL_BG_ALPHA, 0, image)
+        # 绘制半透明背景：只在背景矩形区域内混合，不再为每个标签复制并混合整幅图像
+        roi_x1, roi_y1 = max(text_bg_x1, 0), max(text_bg_y1, 0)
+        roi_x2, roi_y2 = min(text_bg_x2 + 1, image.shape[1]), min(text_bg_y2 + 1, image.shape[0])
+        if roi_x1 < roi_x2 and roi_y1 < roi_y2:
+            roi = image[roi_y1:roi_y2, roi_x1:roi_x2]
+            overlay = roi.copy()
+            cv2.rectangle(overlay, (text_bg_x1 - roi_x1, text_bg_y1 - roi_y1),
+                          (text_bg_x2 - roi_x1, text_bg_y2 - roi_y1), color, -1)
+            roi[...] = cv2.addWeighted(overlay, self.LABEL_BG_ALPHA, roi, 1 - self.LABEL_BG_ALPHA, 0)
 
         # 绘制文本
         text_y = text_bg_y2 - baseline // 2
@@ -1334,16 +1439,8 @@ class DetectionVisualizer:
         """高质量渲染模式 - 支持新数据格式"""
         height, width = image.shape[:2]
 
-        # 初始化Matplotlib图形
-        fig = mplfigure.Figure(frameon=False)
-        dpi = fig.get_dpi()
-        fig.set_size_inches((width + 1e-2) / dpi, (height + 1e-2) / dpi)
-        canvas = FigureCanvasAgg(fig)
-        ax = fig.add_axes([0.0, 0.0, 1.0, 1.0])
-        ax.axis("off")
-        ax.set_xlim(0.0, width)
-        ax.set_ylim(height)
-        ax.invert_yaxis()
+        # 初始化Matplotlib图形（同尺寸复用已缓存的画布）
+        canvas, ax = self._get_hq_canvas(width, height)
 
         # 显示原始图像
         ax.imshow(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
@@ -1378,10 +1475,51 @@ class DetectionVisualizer:
         overlay_img = buffer.reshape(height, width, 4)
 
         # 图像混合
-        alpha_channel = overlay_img[..., 3:].astype(np.float32) / 255.0
-        blended_img = (image * (1 - alpha_channel) + overlay_img[..., :3] * alpha_channel).astype(np.uint8)
+        return self._blend_rgba_overlay(image, overlay_img)
+
+    @classmethod
+    def _get_hq_canvas(self, width: int, height: int):
+        """
+        获取指定尺寸的 Matplotlib 画布和坐标轴
 
-        return blended_img
+        创建 Figure/FigureCanvasAgg 开销较大，按线程缓存最近使用的几种尺寸；
+        命中缓存时清空坐标轴并恢复与新建时相同的坐标设置。
+        """
+        cache = getattr(_HQ_CANVAS_CACHE, 'canvases', None)
+        if cache is None:
+            cache = _HQ_CANVAS_CACHE.canvases = {}
+
+        key = (width, height)
+        entry = cache.pop(key, None)
+        if entry is None:
+            fig = mplfigure.Figure(frameon=False)
+            dpi = fig.get_dpi()
+            fig.set_size_inches((width + 1e-2) / dpi, (height + 1e-2) / dpi)
+            canvas = FigureCanvasAgg(fig)
+            ax = fig.add_axes([0.0, 0.0, 1.0, 1.0])
+            if len(cache) >= _HQ_CANVAS_CACHE_SIZE:
+                cache.pop(next(iter(cache)))
+        else:
+            canvas, ax = entry
+            ax.clear()
+        cache[key] = (canvas, ax)
+
+        ax.axis("off")
+        ax.set_xlim(0.0, width)
+        ax.set_ylim(height)
+        ax.invert_yaxis()
+        return canvas, ax
+
+    @classmethod
+    def _blend_rgba_overlay(self, image: np.ndarray, overlay_img: np.ndarray) -> np.ndarray:
+        """
+        按 overlay 的 alpha 通道混合图像：image * (1 - alpha) + overlay * alpha
+
+        使用 cv2.blendLinear 以 (255 - alpha, alpha) 为逐像素权重在 uint8 上一次完成混合（SIMD），
+        不再生成整幅 float32 中间数组；结果四舍五入，与原浮点截断实现最多相差 1。
+        """
+        alpha = overlay_img[..., 3].astype(np.float32)
+        return cv2.blendLinear(image, np.ascontiguousarray(overlay_img[..., :3]), 255.0 - alpha, alpha)
 
     @classmethod
     def _draw_rectangle_hq(self, ax, label: str, confidence: float, points: List[List[float]],
@@ -1645,9 +1783,11 @@ class DetectionVisualizer:
     @classmethod
     def _get_mpl_class_color(self, class_name: str) -> str:
         """为类别生成Matplotlib颜色"""
-        bgr_color = self._get_class_color(class_name)
-        rgb_color = (bgr_color[2] / 255, bgr_color[1] / 255, bgr_color[0] / 255)
-        return mplc.to_hex(rgb_color)
+        if class_name not in self.MPL_COLOR_PALETTE:
+            bgr_color = self._get_class_color(class_name)
+            rgb_color = (bgr_color[2] / 255, bgr_color[1] / 255, bgr_color[0] / 255)
+            self.MPL_COLOR_PALETTE[class_name] = mplc.to_hex(rgb_color)
+        return self.MPL_COLOR_PALETTE[class_name]
 
     @classmethod
     def _is_valid_bbox(self, image: np.ndarray, x1: int, y1: int, x2: int, y2: int) -> bool:
@@ -0,0 +1,176 @@
+"""
+文件与图像读写的共享辅助函数，供 file_processing 下的多个模块复用
+"""
+import contextlib
+import mmap
+import os
+import stat
+
+import cv2
+import numpy as np
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):  # PyTurboJPEG及libturbojpeg为可选依赖，未安装时使用cv2解码
+    _turbo_jpeg = None
+
+
+def _jpeg_without_exif(data):
+    """
+    判断数据是否为不含EXIF段的JPEG
+
+    只扫描SOI之后连续的APPn段。含EXIF的JPEG可能带有方向信息，需交给 cv2.imdecode 按方向旋转。
+    """
+    if data[:2] != b'\xff\xd8':
+        return False
+    offset = 2
+    while offset + 4 <= len(data) and data[offset] == 0xFF and 0xE0 <= data[offset + 1] <= 0xEF:
+        if data[offset + 1] == 0xE1 and data[offset + 4:offset + 10] == b'Exif\x00\x00':
+            return False
+        offset += 2 + int.from_bytes(data[offset + 2:offset + 4], 'big')
+    return True
+
+
+def _jpeg_size(data):
+    """
+    从JPEG帧头（SOFn段）读取图像尺寸，不解码像素
+
+    Returns:
+        tuple | None: (width, height)，不是JPEG或未找到帧头时返回None
+    """
+    if data[:2] != b'\xff\xd8':
+        return None
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # 填充字节
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            # 无长度字段的独立标记
+            offset += 2
+            continue
+        if marker in (0xD9, 0xDA):
+            # 图像结束或扫描数据开始之前仍未出现帧头
+            return None
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if offset + 9 > len(data):
+                return None
+            height = int.from_bytes(data[offset + 5:offset + 7], 'big')
+            width = int.from_bytes(data[offset + 7:offset + 9], 'big')
+            return width, height
+        offset += 2 + int.from_bytes(data[offset + 2:offset + 4], 'big')
+    return None
+
+
+# 按比例缩小解码的JPEG解码标志，从大到小排列
+_REDUCED_COLOR_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                        (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def _decode_mapped(data, flags):
+    """
+    解码已映射到内存的图像数据，安装了TurboJPEG时，不含EXIF的彩色JPEG使用其SIMD解码器
+    """
+    if _turbo_jpeg is not None and flags == cv2.IMREAD_COLOR and _jpeg_without_exif(data):
+        try:
+            return _turbo_jpeg.decode(data, pixel_format=TJPF_BGR)
+        except Exception:
+            pass
+    buf = np.frombuffer(data, dtype=np.uint8)
+    image = cv2.imdecode(buf, flags)
+    # 释放对映射内存的引用，否则mmap无法关闭
+    del buf
+    return image
+
+
+def imread_mmap(image_path, flags=cv2.IMREAD_COLOR, min_size=None):
+    """
+    通过内存映射读取并解码图像
+
+    压缩数据直接由操作系统页缓存提供给 cv2.imdecode，避免 cv2.imread 在解码前额外复制一份整文件数据，
+    同时兼容包含中文等非ASCII字符的路径。安装了PyTurboJPEG时，不含EXIF的彩色JPEG改用TurboJPEG解码。
+
+    Args:
+        image_path: 图像文件路径
+        flags: cv2.imdecode 的解码标志，默认 cv2.IMREAD_COLOR
+        min_size: 解码结果的最小尺寸 (width, height)，仅对彩色解码有效
+            - None: 按原始分辨率解码
+            - (w, h): 不含EXIF的JPEG按不小于该尺寸的最大比例（1/2、1/4、1/8）缩小解码，其余图像按原始分辨率解码
+
+    Returns:
+        numpy.ndarray | None: 解码后的图像，文件无法读取、为空或无法解码时返回None。
+        tuple: 指定 min_size 时返回 (图像, 原始图像尺寸 (width, height))，无法解码时为 (None, None)
+    """
+    try:
+        with open(image_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return (None, None) if min_size is not None else None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if min_size is None:
+                    return _decode_mapped(mm, flags)
+
+                # 含EXIF的JPEG解码时可能按方向旋转，帧头尺寸与解码结果不一定对应，按原始分辨率解码
+                original_size = _jpeg_size(mm) if flags == cv2.IMREAD_COLOR and _jpeg_without_exif(mm) else None
+                if original_size is not None:
+                    min_w, min_h = min_size
+                    for factor, reduced_flags in _REDUCED_COLOR_FLAGS:
+                        if -(-original_size[0] // factor) >= min_w and -(-original_size[1] // factor) >= min_h:
+                            flags = reduced_flags
+                            break
+                image = _decode_mapped(mm, flags)
+    except OSError:
+        # 与 cv2.imread 一致：路径不存在、是目录或无权限读取时返回None，而不是抛出异常
+        return (None, None) if min_size is not None else None
+    if image is None:
+        return None, None
+    return image, original_size or image.shape[:2][::-1]
+
+
+@contextlib.contextmanager
+def cv2_num_threads(num_threads):
+    """
+    临时设置OpenCV内部线程数，退出时恢复原值
+
+    外层已经用线程池并行处理多张图片时，OpenCV自身的TBB/OpenMP线程会与之叠加造成过度订阅，
+    限制为1可避免线程争用和缓存抖动。cv2.setNumThreads 对整个进程生效，因此在线程池外层设置。
+
+    Args:
+        num_threads: OpenCV使用的线程数
+    """
+    previous = cv2.getNumThreads()
+    cv2.setNumThreads(num_threads)
+    try:
+        yield
+    finally:
+        cv2.setNumThreads(previous)
+
+
+def atomic_write_bytes(file_path: str, data: bytes):
+    """
+    先写入同目录下的临时文件再用 os.replace 替换，写入中途出错时原文件保持完整
+
+    写入的是符号链接指向的真实文件，并保留原文件的权限位。替换后目标路径指向新的inode，
+    指向原文件的硬链接（如备份）仍保留旧内容。
+
+    Args:
+        file_path: 目标文件路径，文件必须已存在
+        data: 支持缓冲区协议的数据（bytes 或 cv2.imencode 返回的数组）
+    """
+    real_path = os.path.realpath(file_path)
+    tmp_path = f"{real_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, stat.S_IMODE(os.stat(real_path).st_mode))
+        os.replace(tmp_path, real_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise